@@ -0,0 +1,87 @@
+"""Measures how many bytes every parsed todo takes in memory
+
+Compares the current Todo with the old layout, which kept the match and a list of associates in a
+per-instance __dict__
+
+    python benchmarks/bench_memory.py [--todos 200000]
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from todot.parser import Parser  # noqa: E402
+
+
+class LegacyTodo:
+    """The todo layout before todos were made compact"""
+
+    def __init__(self, match, *, file_name=None, linepos=None):
+        self.match = match
+        self.file_name = file_name.lstrip(".\\/")
+        self.linepos = linepos
+        self.tag = match.group("tag")
+        self.text = match.group("text")
+        self.associates = [i.strip() for i in match.group("associates").split(",")]
+
+
+def write_files(directory, count, per_file=100):
+    """Writes files with ``count`` todos in total, returning their paths"""
+    files = []
+    for i in range(0, count, per_file):
+        path = os.path.join(directory, f"module_{i // per_file}.py")
+        with open(path, "w", encoding="utf-8") as f:
+            for j in range(min(per_file, count - i)):
+                assignee = "(alice, bob)" if j % 3 == 0 else ""
+                f.write(f"x = {j}  # TODO{assignee}: Handle case number {j} of the input properly\n")
+        files.append(path)
+    return files
+
+
+def measure(build):
+    """Returns the bytes allocated by everything build returns that is still alive"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, used
+
+
+def build_legacy(parser, files):
+    todos = []
+    for file in files:
+        with open(file, encoding="utf-8") as f:
+            for linepos, line in enumerate(f, 1):
+                match = parser.regex.search(line)
+                if match:
+                    todos.append(LegacyTodo(match, file_name=file, linepos=linepos))
+    return todos
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argparser.add_argument("--todos", type=int, default=200000, help="how many todos to parse")
+    args = argparser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        files = write_files(directory, args.todos)
+        parser = Parser([], jobs=1)
+        legacy, legacy_bytes = measure(lambda: build_legacy(parser, files))
+        del legacy
+        compact, compact_bytes = measure(lambda: list(parser.iter_parse_files(files)))
+        count = sum(len(todos) for _, todos in compact)
+
+    print(f"{count} todos")
+    print(f"before: {legacy_bytes / count:8.1f} bytes per todo")
+    print(f"after:  {compact_bytes / count:8.1f} bytes per todo")
+
+
+if __name__ == "__main__":
+    main()
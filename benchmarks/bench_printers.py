@@ -0,0 +1,64 @@
+"""Measures how many todos every printer writes per second
+
+Console printers write to the null device, which pretends to be a terminal for the coloured printer
+so that its colours are measured too, and file printers write to a temporary directory
+
+    python benchmarks/bench_printers.py [--todos 100000]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from todot.printer import (ColoredConsolePrinter, ConsolePrinter, GithubFlavouredMarkdownFilePrinter,  # noqa: E402
+                           MarkdownFilePrinter, TextFilePrinter)
+from todot.todo import Todo  # noqa: E402
+
+
+class NullTerminal(io.TextIOWrapper):
+    """The null device, pretending to be a terminal"""
+
+    def isatty(self):
+        return True
+
+
+def make_todos(count):
+    records = [(i, "TODO" if i % 2 else "FIXME", "alice, bob" if i % 3 == 0 else "", f"Handle case {i} properly")
+               for i in range(1, count + 1)]
+    return [Todo.from_record(record, file_name=f"src/module_{i % 500}.py") for i, record in enumerate(records)]
+
+
+def measure(name, make_printer, todos, stdout):
+    with patch("sys.stdout", stdout):
+        start = time.perf_counter()
+        make_printer(todos).print()
+        elapsed = time.perf_counter() - start
+    print(f"{name:<24} {len(todos) / elapsed:>12,.0f} todos/s", file=sys.stderr)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argparser.add_argument("--todos", type=int, default=100000, help="how many todos to print")
+    args = argparser.parse_args()
+
+    todos = make_todos(args.todos)
+    with open(os.devnull, "wb") as null, tempfile.TemporaryDirectory() as directory:
+        stdout = io.TextIOWrapper(null, encoding="utf-8")
+        terminal = NullTerminal(null, encoding="utf-8")
+        measure("console", ConsolePrinter, todos, stdout)
+        measure("colored (pipe)", ColoredConsolePrinter, todos, stdout)
+        measure("colored (terminal)", ColoredConsolePrinter, todos, terminal)
+        text, markdown = os.path.join(directory, "todo.txt"), os.path.join(directory, "TODO.md")
+        measure("text", lambda t: TextFilePrinter(t, text), todos, stdout)
+        measure("markdown", lambda t: MarkdownFilePrinter(t, markdown), todos, stdout)
+        measure("github", lambda t: GithubFlavouredMarkdownFilePrinter(t, markdown, "https://github.com/a/b"), todos,
+                stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Generates synthetic source trees to benchmark todot on
+
+The same options and seed always generate the same tree
+
+    python benchmarks/generate.py directory [--files 2000] [--depth 4] [--seed 0] ...
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from todot.constants import COMMENT_TOKENS, VALID_FILE_TYPES  # noqa: E402
+
+TAGS = ("TODO", "FIXME", "BUG", "HACK", "XXX")
+PEOPLE = ("alice", "bob", "carol", "dave")
+WORDS = (
+    "handle", "the", "error", "case", "when", "input", "is", "empty", "refactor", "this", "loop", "cache",
+    "result", "remove", "after", "release", "check", "bounds", "before", "reading", "buffer", "value",
+)
+# Directories filled with files that a .gitignore file ignores
+IGNORED_DIRECTORIES = ("build", "dist", "node_modules", "target", "__pycache__")
+
+
+class TreeOptions:
+    """What a generated tree looks like"""
+
+    def __init__(
+        self, *, files=2000, depth=4, fanout=4, languages=None, todo_density=0.02, line_length=60,
+        lines_per_file=200, gitignore_rules=20, ignored_fraction=0.2, seed=0,
+    ):
+        self.files = files
+        self.depth = depth
+        self.fanout = fanout
+        self.languages = list(languages or ["Python", "JavaScript", "C", "Go", "Rust", "HTML", "SQL"])
+        unknown = [i for i in self.languages if i not in VALID_FILE_TYPES]
+        if unknown:
+            raise ValueError(f"Unknown languages: {', '.join(unknown)}")
+        # The fraction of lines that are todos
+        self.todo_density = todo_density
+        self.line_length = line_length
+        self.lines_per_file = lines_per_file
+        # How many rules the .gitignore files have in total, spread over the root and a few subdirectories
+        self.gitignore_rules = gitignore_rules
+        # The fraction of files that are put in ignored directories
+        self.ignored_fraction = ignored_fraction
+        self.seed = seed
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+
+def _line(rng: random.Random, length: int) -> str:
+    words = []
+    while sum(len(i) + 1 for i in words) < length:
+        words.append(rng.choice(WORDS))
+    return " ".join(words)
+
+
+def _todo(rng: random.Random, language: str, length: int) -> str:
+    token = COMMENT_TOKENS[language][0]
+    associates = f"({rng.choice(PEOPLE)})" if rng.random() < 0.3 else ""
+    end = {"/*": " */", "{-": " -}", "<!--": " -->"}.get(token, "")
+    return f"{token} {rng.choice(TAGS)}{associates}: {_line(rng, length // 2)}{end}"
+
+
+def _code(rng: random.Random, language: str, length: int) -> str:
+    token = COMMENT_TOKENS[language][0]
+    if rng.random() < 0.1:
+        return f"{token} {_line(rng, length // 2)}"
+    return f"value_{rng.randrange(1000)} = call({_line(rng, length).replace(' ', ', ')})"
+
+
+def _directories(rng: random.Random, options: TreeOptions):
+    directories = [""]
+    frontier = [""]
+    for level in range(options.depth):
+        next_frontier = []
+        for parent in frontier:
+            for i in range(rng.randint(1, options.fanout)):
+                directory = f"{parent}pkg{level}_{i}/"
+                directories.append(directory)
+                next_frontier.append(directory)
+        frontier = next_frontier
+    return directories
+
+
+def generate_tree(root: str, options: TreeOptions) -> dict:
+    """Writes a tree into a directory, returning how many files, todos and ignored files it has"""
+    rng = random.Random(options.seed)
+    directories = _directories(rng, options)
+    ignored = [f"{rng.choice(directories)}{rng.choice(IGNORED_DIRECTORIES)}/" for _ in range(4)]
+
+    # .gitignore files, the rules that don't match anything still have to be checked for every path
+    rules = {"": [f"{i}/" for i in IGNORED_DIRECTORIES]}
+    for i in range(max(options.gitignore_rules - len(IGNORED_DIRECTORIES), 0)):
+        directory = rng.choice(directories[:1 + len(directories) // 8])
+        rules.setdefault(directory, []).append(
+            rng.choice(("*.log", "*.tmp", f"generated_{i}/", f"**/cache_{i}/**", f"/local_{i}", f"!keep_{i}.log"))
+        )
+    for directory, lines in rules.items():
+        os.makedirs(os.path.join(root, directory), exist_ok=True)
+        with open(os.path.join(root, directory, ".gitignore"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    stats = {"files": 0, "todos": 0, "ignored_files": 0}
+    for i in range(options.files):
+        language = options.languages[i % len(options.languages)]
+        extension = VALID_FILE_TYPES[language][0]
+        is_ignored = rng.random() < options.ignored_fraction
+        directory = rng.choice(ignored if is_ignored else directories)
+        os.makedirs(os.path.join(root, directory), exist_ok=True)
+        lines = []
+        for _ in range(max(1, int(rng.gauss(options.lines_per_file, options.lines_per_file / 4)))):
+            if rng.random() < options.todo_density:
+                lines.append(_todo(rng, language, options.line_length))
+                stats["todos"] += not is_ignored
+            else:
+                lines.append(_code(rng, language, options.line_length))
+        with open(os.path.join(root, directory, f"file_{i}.{extension}"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        stats["files"] += 1
+        stats["ignored_files"] += is_ignored
+    return stats
+
+
+def add_tree_arguments(argparser: argparse.ArgumentParser):
+    """Adds the options of TreeOptions to an argument parser"""
+    defaults = TreeOptions()
+    argparser.add_argument("--files", type=int, default=defaults.files, help="how many files to generate")
+    argparser.add_argument("--depth", type=int, default=defaults.depth, help="how deep the directories go")
+    argparser.add_argument("--fanout", type=int, default=defaults.fanout, help="most subdirectories per directory")
+    argparser.add_argument(
+        "--languages", type=str, default=",".join(defaults.languages), help="comma delimited languages to use"
+    )
+    argparser.add_argument(
+        "--todo-density", type=float, default=defaults.todo_density, help="the fraction of lines that are todos"
+    )
+    argparser.add_argument("--line-length", type=int, default=defaults.line_length, help="about how long lines are")
+    argparser.add_argument(
+        "--lines-per-file", type=int, default=defaults.lines_per_file, help="about how many lines files have"
+    )
+    argparser.add_argument(
+        "--gitignore-rules", type=int, default=defaults.gitignore_rules, help="how many .gitignore rules to write"
+    )
+    argparser.add_argument(
+        "--ignored-fraction", type=float, default=defaults.ignored_fraction, help="the fraction of ignored files"
+    )
+    argparser.add_argument("--seed", type=int, default=defaults.seed, help="the seed of the random generator")
+
+
+def tree_options(args) -> TreeOptions:
+    """Makes the TreeOptions from the arguments added by add_tree_arguments"""
+    return TreeOptions(
+        files=args.files, depth=args.depth, fanout=args.fanout, languages=args.languages.split(","),
+        todo_density=args.todo_density, line_length=args.line_length, lines_per_file=args.lines_per_file,
+        gitignore_rules=args.gitignore_rules, ignored_fraction=args.ignored_fraction, seed=args.seed,
+    )
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argparser.add_argument("directory", help="the directory to generate the tree in")
+    add_tree_arguments(argparser)
+    args = argparser.parse_args()
+    print(generate_tree(args.directory, tree_options(args)))
+
+
+if __name__ == "__main__":
+    main()
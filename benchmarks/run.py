@@ -0,0 +1,162 @@
+"""Times every phase of todot on a generated tree and compares the results with a baseline
+
+The phases are walking the tree, matching paths against .gitignore files and exclude patterns,
+parsing, formatting and writing. Every phase runs ``--repeat`` times and the fastest run is kept
+
+    python benchmarks/run.py [--output results.json] [--baseline baseline.json] [--threshold 0.25]
+
+Exits with status 1 if any phase is more than ``--threshold`` slower than in the baseline
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate import add_tree_arguments, generate_tree, tree_options  # noqa: E402
+
+from todot import __version__  # noqa: E402
+from todot.finder import Finder  # noqa: E402
+from todot.ignore import ExcludeMatcher, GitIgnoreMatcher  # noqa: E402
+from todot.parser import Parser  # noqa: E402
+from todot.printer import ConsolePrinter, NdjsonPrinter, TextFilePrinter  # noqa: E402
+
+RESULTS_VERSION = 1
+# Exclude patterns matched in the ignore phase, a mix of exact paths and globs
+EXCLUDE_PATTERNS = ("pkg0_0/pkg1_0", "*.min.js", "**/generated/**", "vendor/", "docs/*.md")
+
+
+def best_time(function, repeat):
+    """Returns the fastest time out of several runs, along with what the last run returned"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def match_ignores(root, files):
+    """Matches every file against the .gitignore files above it and the exclude patterns"""
+    matcher = GitIgnoreMatcher()
+    excluder = ExcludeMatcher(EXCLUDE_PATTERNS)
+    levels = {"": matcher.enter((), root, "")}
+    ignored = 0
+    for relative in files:
+        parts = relative.split("/")
+        # The levels of every directory are worked out once, the same way the walker does it
+        for i in range(1, len(parts)):
+            directory = "/".join(parts[:i])
+            if directory not in levels:
+                levels[directory] = matcher.enter(
+                    levels["/".join(parts[:i - 1])], os.path.join(root, directory), directory
+                )
+        file_levels = levels["/".join(parts[:-1])]
+        ignored += matcher.is_ignored(file_levels, relative) or excluder.is_path_excluded(relative)
+    return ignored
+
+
+def run_phases(root, repeat):
+    """Times every phase, returning a dict of phase names to their results"""
+    phases = {}
+
+    def record(name, seconds, items):
+        phases[name] = {"seconds": seconds, "items": items, "per_second": items / seconds if seconds else None}
+
+    seconds, files = best_time(lambda: list(Finder(root, git_files=False).iter_find()), repeat)
+    record("walk", seconds, len(files))
+
+    relative = [os.path.relpath(i, root).replace(os.sep, "/") for i in files]
+    seconds, _ = best_time(lambda: match_ignores(root, relative), repeat)
+    record("ignore", seconds, len(relative))
+
+    seconds, todos = best_time(lambda: Parser(files, jobs=1).parse(), repeat)
+    record("parse", seconds, len(files))
+
+    seconds, _ = best_time(lambda: sum(1 for _ in ConsolePrinter(todos).iter_format()), repeat)
+    record("format", seconds, len(todos))
+
+    with tempfile.TemporaryDirectory() as directory:
+        text, ndjson = os.path.join(directory, "todo.txt"), os.path.join(directory, "todos.ndjson")
+
+        def write():
+            TextFilePrinter(todos, text).print()
+            NdjsonPrinter(todos, ndjson).print()
+
+        with open(os.devnull, "w") as null:
+            stdout, sys.stdout = sys.stdout, null
+            try:
+                seconds, _ = best_time(write, repeat)
+            finally:
+                sys.stdout = stdout
+    record("write", seconds, len(todos) * 2)
+    return phases
+
+
+def compare(results, baseline, threshold):
+    """Prints every phase next to the baseline, returning the phases that got slower than the threshold"""
+    regressions = []
+    print(f"{'phase':<8} {'seconds':>10} {'baseline':>10} {'change':>8}")
+    for name, phase in results["phases"].items():
+        base = (baseline or {}).get("phases", {}).get(name)
+        if not base:
+            print(f"{name:<8} {phase['seconds']:>10.4f} {'-':>10} {'-':>8}")
+            continue
+        change = phase["seconds"] / base["seconds"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<8} {phase['seconds']:>10.4f} {base['seconds']:>10.4f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argparser.add_argument("--repeat", type=int, default=5, help="how many times to run every phase")
+    argparser.add_argument("--output", type=str, default=None, help="a file to write the results to as JSON")
+    argparser.add_argument("--baseline", type=str, default=None, help="a results file to compare against")
+    argparser.add_argument(
+        "--threshold", type=float, default=0.25, help="how much slower a phase can get, by default 0.25 (25%%)"
+    )
+    argparser.add_argument("--tree", type=str, default=None, help="use an existing directory instead of generating")
+    add_tree_arguments(argparser)
+    args = argparser.parse_args()
+
+    options = tree_options(args)
+    with tempfile.TemporaryDirectory() as directory:
+        root = args.tree or directory
+        tree = generate_tree(root, options) if args.tree is None else None
+        phases = run_phases(root, args.repeat)
+    results = {
+        "version": RESULTS_VERSION,
+        "todot": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "tree": options.to_dict() if args.tree is None else {"path": args.tree},
+        "generated": tree,
+        "phases": phases,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("tree") != results["tree"]:
+            print("The baseline was made with a different tree, the comparison may not mean much", file=sys.stderr)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"Slower than the baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Tests for reading todos from archives"""
+import io
+import os
+import tarfile
+import tempfile
+import zipfile
+
+from todot import Scanner
+from todot.parser import Parser
+
+MEMBERS = {
+    "src/main.py": b"# TODO: In the archive\n",
+    "./src/lib.js": b"// FIXME: Also in the archive\n",
+    "src/.hidden/secret.py": b"# TODO: Hidden\n",
+    "src/data.bin": b"TODO: Not a source file\n",
+    "src/image.png": b"\0\0# TODO: Binary\n",
+}
+
+
+def create_tar(path, mode="w:gz"):
+    with tarfile.open(path, mode) as archive:
+        for name, data in MEMBERS.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+def create_zip(path):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in MEMBERS.items():
+            archive.writestr(name, data)
+
+
+def test_parser_archives():
+    """Test that the source files inside tar and zip archives are parsed without extracting them"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tar_path = os.path.join(tmpdir, "release.tar.gz")
+        zip_path = os.path.join(tmpdir, "release.zip")
+        create_tar(tar_path)
+        create_zip(zip_path)
+        for path in (tar_path, zip_path):
+            parser = Parser([path])
+            todos = parser.parse()
+            assert [(t.file_name, t.text) for t in todos] == [
+                (f"{path}!/src/main.py".lstrip("/"), "In the archive"),
+                (f"{path}!/src/lib.js".lstrip("/"), "Also in the archive"),
+            ]
+        # Nothing was extracted
+        assert sorted(os.listdir(tmpdir)) == ["release.tar.gz", "release.zip"]
+
+
+def test_scanner_archives():
+    """Test that archives use the scanner's filters and are scanned between other paths in order"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tar_path = os.path.join(tmpdir, "release.tar")
+        create_tar(tar_path, "w")
+        main = os.path.join(tmpdir, "main.py")
+        with open(main, "w") as f:
+            f.write("# TODO: Outside\n")
+        scanner = Scanner(exclude=["src/lib.js"])
+        assert [t.text for t in scanner.scan([main, tar_path, main])] == ["Outside", "In the archive"]
+        assert [t.text for t in scanner.scan_file(tar_path)] == ["In the archive"]
+
+
+def test_parser_broken_archive():
+    """Test that archives that can't be read are skipped"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "broken.zip")
+        with open(path, "wb") as f:
+            f.write(b"not a zip file")
+        parser = Parser([path])
+        assert parser.parse() == []
+        assert parser.skipped["unreadable"] == 1
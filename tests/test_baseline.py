@@ -0,0 +1,83 @@
+"""Tests for comparing todos with a baseline"""
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+
+import pytest
+
+from todot.baseline import changed_files, diff, load_baseline
+from todot.parser import Parser
+from todot.printer import DeltaPrinter
+from todot.todo import iter_fingerprints
+
+
+def parse(path):
+    return list(iter_fingerprints(Parser([path]).iter_parse()))
+
+
+def test_baseline_diff():
+    """Test that todos moving to other lines are unchanged and only added or removed todos are reported"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, "a.py")
+        with open(source, "w") as f:
+            f.write("# TODO: One\n# TODO: Same\n# FIXME: Removed\n")
+        baseline_file = os.path.join(tmpdir, "baseline.json")
+        with open(baseline_file, "w") as f:
+            for todo, fingerprint in parse(source):
+                f.write(json.dumps(dict(todo.to_dict(), fingerprint=fingerprint)) + "\n")
+        baseline = load_baseline(baseline_file)
+
+        with open(source, "w") as f:
+            f.write("x = 1\n\n# TODO:   One\n# TODO: Same\n# TODO: Same\n")
+        added, removed = diff(parse(source), baseline)
+        assert [(t.linepos, t.text) for t, _ in added] == [(5, "Same")]
+        assert [t.text for t, _ in removed] == ["Removed"]
+        assert list(DeltaPrinter(added, removed).iter_format()) == [
+            f"- {removed[0][0].file_name}:3 FIXME: Removed",
+            f"+ {added[0][0].file_name}:5 TODO: Same",
+        ]
+
+        # Only the baseline todos of the files that were compared can be removed
+        assert diff([], baseline, files={"other.py"}) == ([], [])
+
+
+def test_load_baseline_json():
+    """Test reading a baseline from a JSON list of todos without fingerprints"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, "a.py")
+        with open(source, "w") as f:
+            f.write("# TODO: Same\n# TODO: Same\n")
+        todos = parse(source)
+        baseline_file = os.path.join(tmpdir, "baseline.json")
+        with open(baseline_file, "w") as f:
+            json.dump({"todos": [t.to_dict() for t, _ in todos]}, f)
+        assert sorted(load_baseline(baseline_file)) == sorted(i for _, i in todos)
+
+
+def test_changed_files():
+    """Test listing the files changed since a git ref"""
+    if shutil.which("git") is None:
+        pytest.skip("git is not installed")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        def git(*args):
+            subprocess.run(["git", "-C", tmpdir, *args], check=True, stdout=subprocess.DEVNULL)
+
+        git("init", "-q")
+        for name in ("same.py", "changed.py", "deleted.py"):
+            with open(os.path.join(tmpdir, name), "w") as f:
+                f.write("# TODO: Committed\n")
+        git("add", ".")
+        git("-c", "user.name=Jane", "-c", "user.email=jane@example.com", "commit", "-q", "-m", "Add")
+        with open(os.path.join(tmpdir, "changed.py"), "a") as f:
+            f.write("# TODO: Changed\n")
+        with open(os.path.join(tmpdir, "new.py"), "w") as f:
+            f.write("# TODO: New\n")
+        os.remove(os.path.join(tmpdir, "deleted.py"))
+
+        changed = sorted(os.path.relpath(i, tmpdir) for i in changed_files(tmpdir, "HEAD"))
+        assert changed == ["changed.py", "deleted.py", "new.py"]
+        with pytest.raises(OSError):
+            changed_files(tmpdir, "no-such-ref")
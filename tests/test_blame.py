@@ -0,0 +1,79 @@
+"""Tests for the Blamer class"""
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest.mock import patch
+
+import pytest
+
+from todot.blame import Blamer, _line_ranges, parse_porcelain
+from todot.cache import ParseCache
+from todot.parser import Parser
+from todot.printer import ConsolePrinter
+
+PORCELAIN = b"""\
+1111111111111111111111111111111111111111 2 2 1
+author Jane Doe
+author-mail <jane@example.com>
+author-time 1709280000
+author-tz +0200
+summary Add a
+filename a.py
+\t# TODO: First
+1111111111111111111111111111111111111111 4 4 1
+\t# TODO: Second
+0000000000000000000000000000000000000000 5 5 1
+author Not Committed Yet
+author-time 1709290000
+author-tz +0000
+filename a.py
+\t# TODO: Third
+"""
+
+
+def test_parse_porcelain():
+    """Test reading the author and the date of every line from git blame --porcelain"""
+    blamed = parse_porcelain(PORCELAIN)
+    assert blamed[2] == ("1" * 40, "Jane Doe", "2024-03-01T10:00:00+02:00")
+    assert blamed[4] == blamed[2]
+    assert blamed[5] == ("0" * 40, None, None)
+    assert _line_ranges([1, 2, 3, 7, 9, 10]) == [(1, 3), (7, 7), (9, 10)]
+
+
+def git(*args, cwd):
+    subprocess.run(["git", *args], cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+
+
+def test_blamer():
+    """Test that todos are blamed once per file and that committed lines are cached"""
+    if shutil.which("git") is None:
+        pytest.skip("git is not installed")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        git("init", "-q", cwd=tmpdir)
+        git("config", "user.name", "Jane Doe", cwd=tmpdir)
+        git("config", "user.email", "jane@example.com", cwd=tmpdir)
+        source = os.path.join(tmpdir, "a.py")
+        with open(source, "w") as f:
+            f.write("x = 1\n# TODO: First\n\n# FIXME: Second\n")
+        git("add", "a.py", cwd=tmpdir)
+        git("commit", "-q", "-m", "Add a", cwd=tmpdir)
+        with open(source, "a") as f:
+            f.write("# TODO: Not committed\n")
+
+        cache = ParseCache(os.path.join(tmpdir, "cache"))
+        blamer = Blamer(workers=2, cache=cache)
+        files = Parser([source]).iter_parse_files([source])
+        with patch.object(Blamer, "_run_blame", wraps=Blamer._run_blame) as run_blame:
+            [(_, todos)] = list(blamer.iter_blame(files))
+            run_blame.assert_called_once_with(source, [2, 4, 5])
+        assert [(t.author, t.linepos) for t in todos] == [("Jane Doe", 2), ("Jane Doe", 4), (None, 5)]
+        assert todos[0].to_dict()["author"] == "Jane Doe"
+        assert ConsolePrinter(todos).format_todo(todos[0], 0).endswith(f"First [Jane Doe, {todos[0].date[:10]}]")
+
+        # Only the line that isn't committed is blamed again
+        with patch.object(Blamer, "_run_blame", return_value={}) as run_blame:
+            blamer.blame_file(source, todos)
+            run_blame.assert_called_once_with(source, [5])
+        cache.close()
@@ -0,0 +1,165 @@
+"""Tests for the ParseCache class"""
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+from todot.__main__ import create_scanner
+from todot.cache import ParseCache
+from todot.cli import argparser
+from todot.parser import Parser
+from todot.stats import Stats
+
+
+def write_old_file(path, content):
+    """Writes a file and moves its modification time to the past so it can be cached"""
+    with open(path, 'w') as f:
+        f.write(content)
+    old = time.time() - 60
+    os.utime(path, (old, old))
+
+
+def test_cache_skips_unchanged_files():
+    """Test that unchanged files are read from the cache instead of parsed"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, "test.py")
+        write_old_file(source, "# TODO(john): Cached todo\n")
+        cache_dir = os.path.join(tmpdir, "cache")
+
+        cache = ParseCache(cache_dir)
+        first = Parser([source], cache=cache).parse()
+        cache.close()
+
+        cache = ParseCache(cache_dir)
+        with patch('todot.parser._parse_file') as mock_parse:
+            second = Parser([source], cache=cache).parse()
+            mock_parse.assert_not_called()
+        cache.close()
+
+        assert [repr(t) for t in second] == [repr(t) for t in first]
+
+
+def test_cache_reparses_changed_files():
+    """Test that changing a file invalidates its cache entry"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, "test.py")
+        write_old_file(source, "# TODO: Old todo\n")
+        cache = ParseCache(os.path.join(tmpdir, "cache"))
+        Parser([source], cache=cache).parse()
+
+        write_old_file(source, "# TODO: New todo\n# FIXME: Another one\n")
+        todos = Parser([source], cache=cache).parse()
+        cache.close()
+
+        assert [t.text for t in todos] == ["New todo", "Another one"]
+
+
+def test_cache_does_not_store_recently_modified_files():
+    """Test that files modified within the racy window are never cached"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, "test.py")
+        with open(source, 'w') as f:
+            f.write("# TODO: Fresh todo\n")
+
+        cache = ParseCache(os.path.join(tmpdir, "cache"))
+        assert cache.key(source) is None
+        # A cache that is kept around stores the file once it hasn't changed for a while
+        later = time.time() + 60
+        with patch("todot.cache.time.time", return_value=later):
+            assert cache.key(source) is not None
+        cache.close()
+
+
+def test_cache_errors_go_to_stderr(capsys):
+    """Test that a cache that can't be opened is reported on stderr, leaving the output alone"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        blocker = os.path.join(tmpdir, "file")
+        with open(blocker, 'w') as f:
+            f.write("")
+        cache = ParseCache(os.path.join(blocker, "cache"))
+        cache.close()
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert "Failed to open the cache" in captured.err
+
+
+def test_cache_namespace_depends_on_tags():
+    """Test that parsers with different tags don't share cache entries"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, "test.py")
+        write_old_file(source, "# TODO: A todo\n# NOTE: A note\n")
+        cache = ParseCache(os.path.join(tmpdir, "cache"))
+
+        assert len(Parser([source], cache=cache).parse()) == 1
+        assert len(Parser([source], tags=["NOTE"], cache=cache).parse()) == 1
+        assert Parser([source], tags=["NOTE"]).cache_namespace != Parser([source]).cache_namespace
+        cache.close()
+
+
+def test_cache_rebuild():
+    """Test that rebuilding the cache throws away old entries"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, "test.py")
+        write_old_file(source, "# TODO: A todo\n")
+        cache_dir = os.path.join(tmpdir, "cache")
+        cache = ParseCache(cache_dir)
+        parser = Parser([source], cache=cache)
+        parser.parse()
+        cache.close()
+
+        cache = ParseCache(cache_dir, rebuild=True)
+        assert cache.get(parser.cache_namespace, source, cache.key(source)) is None
+        cache.close()
+
+
+def test_cache_eviction():
+    """Test that the least recently used entries are evicted once the cache is too big"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = ParseCache(os.path.join(tmpdir, "cache"), max_size=200)
+        key = (1, 1, "")
+        for i in range(10):
+            cache.put("namespace", f"file{i}.py", key, [(1, "TODO", "", "x" * 20)])
+        cache.flush()
+
+        assert cache.get("namespace", "file0.py", key) is None
+        assert cache.get("namespace", "file9.py", key) is not None
+        cache.close()
+
+
+def test_cache_flags_from_config():
+    """Test that cache flags read from the config file as strings are turned into booleans"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        args = argparser.parse_args([])
+        args.cache_dir = os.path.join(tmpdir, "cache")
+        args.rebuild_cache = "no"
+        with patch("todot.__main__.ParseCache") as cache:
+            create_scanner(args)
+        assert cache.call_args[1]["rebuild"] is False
+
+        args.no_cache = "yes"
+        assert create_scanner(args).cache is None
+
+
+def test_cache_keeps_replaced_status():
+    """Test that files with replaced characters are counted the same way whether or not they come from the cache"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dirty = os.path.join(tmpdir, "dirty.py")
+        write_old_file(os.path.join(tmpdir, "clean.py"), "# TODO: Clean\n")
+        with open(dirty, 'wb') as f:
+            f.write("# TODO: Café\n".encode("latin-1"))
+        old = time.time() - 60
+        os.utime(dirty, (old, old))
+        files = [os.path.join(tmpdir, "clean.py"), dirty]
+        cache_dir = os.path.join(tmpdir, "cache")
+
+        runs = []
+        for _ in range(2):
+            cache = ParseCache(cache_dir)
+            stats = Stats()
+            parser = Parser(files, cache=cache, stats=stats)
+            texts = [t.text for t in parser.parse()]
+            cache.close()
+            runs.append((texts, parser.replaced, stats.counters["cached"]))
+
+        assert runs[0] == (["Clean", "Caf�"], 1, 0)
+        assert runs[1] == (["Clean", "Caf�"], 1, 2)
@@ -2,7 +2,7 @@
 import tempfile
 import os
 from pathlib import Path
-from todot.finder import Finder
+from todot.finder import Finder, Visited
 
 
 def test_finder_initialization():
@@ -151,6 +151,23 @@ def test_finder_exclude_patterns():
         assert len(found_files) >= 2
 
 
+def test_finder_exclude_globs():
+    """Test excluding files and directories with glob patterns"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for filename in ("main.py", "app.min.js", "src/generated/models.py", "src/deep/generated/api.py", "src/app.py"):
+            path = os.path.join(tmpdir, *filename.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write("# Test content\n")
+
+        exclude = ["**/generated/**", "*.min.js", "src/app.py"]
+        finder = Finder(path=tmpdir, exclude=exclude, git_files=False)
+        found_filenames = sorted(os.path.relpath(f, tmpdir) for f in finder.find())
+
+        assert found_filenames == ["main.py"]
+        assert exclude == ["**/generated/**", "*.min.js", "src/app.py"]
+
+
 def test_finder_hidden_files_exclusion():
     """Test that hidden files (starting with .) are excluded"""
     with tempfile.TemporaryDirectory() as tmpdir:
@@ -190,3 +207,138 @@ def test_finder_nonexistent_path():
 
     # Should return None due to exception handling
     assert found_files is None
+
+
+def test_finder_iter_find():
+    """Test that iter_find yields the same files as find"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.makedirs(os.path.join(tmpdir, "subdir"))
+        for filename in ("root.py", os.path.join("subdir", "sub.py")):
+            with open(os.path.join(tmpdir, filename), 'w') as f:
+                f.write("# Test content\n")
+
+        finder = Finder(path=tmpdir)
+        found_files = finder.iter_find()
+
+        assert not isinstance(found_files, list)
+        assert sorted(found_files) == sorted(Finder(path=tmpdir).find())
+
+
+def test_finder_git_files():
+    """Test listing files from the git index"""
+    import shutil
+    import subprocess
+
+    import pytest
+
+    if shutil.which("git") is None:
+        pytest.skip("git is not installed")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        subprocess.run(["git", "init", "-q", tmpdir], check=True)
+        os.makedirs(os.path.join(tmpdir, "build"))
+        files = {
+            ".gitignore": "build/\n",
+            "tracked.py": "# Tracked\n",
+            "untracked.js": "// Untracked\n",
+            "excluded.py": "# Excluded\n",
+            os.path.join("build", "generated.py"): "# Ignored\n",
+        }
+        for filename, content in files.items():
+            with open(os.path.join(tmpdir, filename), 'w') as f:
+                f.write(content)
+        subprocess.run(["git", "-C", tmpdir, "add", "tracked.py"], check=True)
+
+        finder = Finder(path=tmpdir, exclude=["excluded.py"])
+        found_filenames = sorted(os.path.relpath(f, tmpdir) for f in finder.iter_find())
+
+        assert finder.git_failed is False
+        assert found_filenames == ["tracked.py", "untracked.js"]
+
+
+def test_finder_git_files_fallback():
+    """Test that the finder walks the directories when the path is not a git repository"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with open(os.path.join(tmpdir, "test.py"), 'w') as f:
+            f.write("# Test content\n")
+
+        finder = Finder(path=tmpdir, git_files=True)
+        found_filenames = [os.path.basename(f) for f in finder.iter_find()]
+
+        assert found_filenames == ["test.py"]
+
+
+def test_finder_walk_threads():
+    """Test that walking with threads finds the same files in the same order"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for i in range(5):
+            for j in range(5):
+                directory = os.path.join(tmpdir, f"dir{i}", f"sub{j}")
+                os.makedirs(directory)
+                for k in range(3):
+                    with open(os.path.join(directory, f"file{k}.py"), 'w') as f:
+                        f.write("# Test content\n")
+
+        serial = Finder(path=tmpdir, git_files=False).find()
+        threaded = Finder(path=tmpdir, git_files=False, walk_threads=4).find()
+
+        assert len(serial) == 75
+        assert threaded == serial
+
+
+def test_finder_deep_tree():
+    """Test that trees deeper than the recursion limit can be walked"""
+    import sys
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        directory = os.path.join(tmpdir, *["d"] * 150)
+        os.makedirs(directory)
+        with open(os.path.join(directory, "deep.py"), 'w') as f:
+            f.write("# Test content\n")
+
+        # Leave less room on the stack than the tree is deep
+        frame, current_depth = sys._getframe(), 0
+        while frame is not None:
+            frame, current_depth = frame.f_back, current_depth + 1
+        recursion_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(current_depth + 100)
+        try:
+            found = [Finder(path=tmpdir, git_files=False, walk_threads=n).find() for n in (1, 4)]
+        finally:
+            sys.setrecursionlimit(recursion_limit)
+
+        assert found == [[os.path.join(directory, "deep.py")]] * 2
+
+
+def test_finder_symlinks_found_once():
+    """Test that files reachable through symlinks and hard links are found once and symlink loops end"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.makedirs(os.path.join(tmpdir, "src", "sub"))
+        Path(tmpdir, "src", "a.py").write_text("# TODO: a\n")
+        os.link(os.path.join(tmpdir, "src", "a.py"), os.path.join(tmpdir, "src", "b.py"))
+        os.symlink(os.path.join(tmpdir, "src"), os.path.join(tmpdir, "src", "sub", "loop"))
+        os.symlink(os.path.join(tmpdir, "src"), os.path.join(tmpdir, "link"))
+
+        files = Finder(tmpdir, git_files=False).find()
+        assert len(files) == 1
+
+        # Searches that share what they found never find the same file twice
+        visited = Visited()
+        assert len(list(Finder(os.path.join(tmpdir, "link"), git_files=False).iter_find(visited))) == 1
+        assert list(Finder(os.path.join(tmpdir, "src"), git_files=False).iter_find(visited)) == []
+
+
+def test_finder_walk_threads_found_under_first_path():
+    """Test that with threads a file reachable through a symlink is found under the same path as without threads"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.makedirs(os.path.join(tmpdir, "x"))
+        os.makedirs(os.path.join(tmpdir, "y", "shared"))
+        for i in range(20):
+            Path(tmpdir, "y", f"f{i}.py").write_text("# TODO: y\n")
+        Path(tmpdir, "y", "shared", "f.py").write_text("# TODO: shared\n")
+        os.symlink(os.path.join("..", "y", "shared"), os.path.join(tmpdir, "x", "link"))
+
+        serial = Finder(tmpdir, git_files=False).find()
+        assert os.path.join(tmpdir, "x", "link", "f.py") in serial
+        for _ in range(50):
+            assert Finder(tmpdir, git_files=False, walk_threads=4).find() == serial
@@ -0,0 +1,152 @@
+"""Tests for the GitIgnoreMatcher and ExcludeMatcher classes"""
+import os
+import tempfile
+from unittest.mock import patch
+
+from todot.finder import Finder
+from todot.ignore import ExcludeMatcher, GitIgnoreMatcher
+
+
+def create_tree(root, files):
+    """Creates files relative to root, making directories as needed"""
+    for filename, content in files.items():
+        path = os.path.join(root, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+
+def test_gitignore_matcher_levels():
+    """Test that deeper .gitignore files take precedence over the ones above them"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        create_tree(tmpdir, {
+            ".gitignore": "*.log\nbuild/\n",
+            os.path.join("sub", ".gitignore"): "!keep.log\n",
+        })
+        matcher = GitIgnoreMatcher()
+        root = matcher.enter((), tmpdir, "")
+        sub = matcher.enter(root, os.path.join(tmpdir, "sub"), "sub")
+
+        assert matcher.is_ignored(root, "debug.log")
+        assert matcher.is_ignored(root, "build", is_dir=True)
+        assert not matcher.is_ignored(root, "build.py")
+        assert matcher.is_ignored(sub, "sub/other.log")
+        assert not matcher.is_ignored(sub, "sub/keep.log")
+        assert matcher.is_ignored(root, "keep.log")
+
+
+def test_gitignore_matcher_anchored_patterns():
+    """Test that patterns with a slash are relative to the directory of their .gitignore"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        create_tree(tmpdir, {os.path.join("sub", ".gitignore"): "/generated.py\n"})
+        matcher = GitIgnoreMatcher()
+        levels = matcher.enter(matcher.enter((), tmpdir, ""), os.path.join(tmpdir, "sub"), "sub")
+
+        assert matcher.is_ignored(levels, "sub/generated.py")
+        assert not matcher.is_ignored(levels, "sub/deeper/generated.py")
+
+
+def test_finder_nested_gitignore():
+    """Test that the finder uses nested .gitignore files"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        create_tree(tmpdir, {
+            ".gitignore": "build/\n",
+            "main.py": "",
+            os.path.join("build", "out.py"): "",
+            os.path.join("src", ".gitignore"): "*_pb2.py\n",
+            os.path.join("src", "app.py"): "",
+            os.path.join("src", "app_pb2.py"): "",
+        })
+        found = Finder(path=tmpdir, gitignore=True, git_files=False).find()
+        found_filenames = sorted(os.path.relpath(f, tmpdir).replace("\\", "/") for f in found)
+
+        assert found_filenames == ["main.py", "src/app.py"]
+
+
+def test_finder_gitignore_above_root():
+    """Test that .gitignore files between the top of the repository and a subdirectory root are used"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.makedirs(os.path.join(tmpdir, ".git"))
+        create_tree(tmpdir, {
+            ".gitignore": "src/gen/\n*_pb2.py\n",
+            os.path.join("src", ".gitignore"): "!keep_pb2.py\n",
+            os.path.join("src", "app.py"): "",
+            os.path.join("src", "app_pb2.py"): "",
+            os.path.join("src", "keep_pb2.py"): "",
+            os.path.join("src", "gen", "out.py"): "",
+        })
+        root = os.path.join(tmpdir, "src")
+        for walk_threads in (1, 4):
+            finder = Finder(path=root, gitignore=True, git_files=False, walk_threads=walk_threads)
+            found = sorted(os.path.relpath(f, root).replace("\\", "/") for f in finder.find())
+            assert found == ["app.py", "keep_pb2.py"]
+        finder = Finder(path=root, gitignore=True, git_files=False)
+        assert not finder.accepts(os.path.join(root, "gen", "new.py"))
+        assert finder.accepts(os.path.join(root, "new.py"))
+        assert [os.path.relpath(i, root) for i in finder.iter_directories()] == ["."]
+
+def test_finder_prunes_ignored_directories():
+    """Test that ignored directories are never listed"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        create_tree(tmpdir, {
+            ".gitignore": "node_modules/\n",
+            "main.py": "",
+            os.path.join("node_modules", "lib", "index.js"): "",
+        })
+        listed = []
+        original_scandir = os.scandir
+
+        def recording_scandir(path):
+            listed.append(os.path.basename(path))
+            return original_scandir(path)
+
+        with patch('todot.finder.os.scandir', side_effect=recording_scandir):
+            found = Finder(path=tmpdir, gitignore=True, git_files=False).find()
+
+        assert [os.path.basename(f) for f in found] == ["main.py"]
+        assert "node_modules" not in listed
+
+
+def test_exclude_matcher_exact_paths():
+    """Test that exact paths only match that path and everything inside it"""
+    matcher = ExcludeMatcher(["TODO.md", " src/app.py", "docs\\api"])
+
+    assert matcher.paths == {"TODO.md", "src/app.py", "docs/api"}
+    assert matcher.regex is None
+    assert matcher.is_excluded("TODO.md")
+    assert not matcher.is_excluded("sub/TODO.md")
+    assert matcher.is_excluded("other/app.py", "src/app.py")
+    assert matcher.is_path_excluded("docs/api/index.md")
+    assert not matcher.is_path_excluded("docs/guide.md")
+
+
+def test_exclude_matcher_directory_paths():
+    """Test that paths ending with a slash only match directories, at any depth when they have no other slash"""
+    matcher = ExcludeMatcher(["build/", "./src/gen/"])
+
+    assert matcher.is_excluded("build", is_dir=True)
+    assert not matcher.is_excluded("build")
+    assert matcher.is_excluded("src/build", is_dir=True)
+    assert matcher.is_path_excluded("build/lib/out.py")
+    assert matcher.is_path_excluded("src/build/out.py")
+    assert matcher.is_excluded("src/gen", is_dir=True)
+    assert matcher.is_path_excluded("src/gen/out.py")
+    assert not matcher.is_path_excluded("lib/src/gen/out.py")
+
+
+def test_exclude_matcher_globs():
+    """Test glob patterns, including ** and directory only patterns"""
+    matcher = ExcludeMatcher(["**/generated/**", "*.min.js", "docs/*.md", "out-*/", "test_?.py", "[!a]*.c"])
+
+    assert matcher.is_excluded("a/b/generated", is_dir=True)
+    assert matcher.is_excluded("generated/models.py")
+    assert matcher.is_excluded("lib/app.min.js")
+    assert matcher.is_excluded("docs/readme.md")
+    assert not matcher.is_excluded("docs/guide/readme.md")
+    assert matcher.is_excluded("out-debug", is_dir=True)
+    assert not matcher.is_excluded("out-debug")
+    assert matcher.is_path_excluded("src/out-debug/main.py")
+    assert matcher.is_excluded("test_1.py")
+    assert not matcher.is_excluded("test_12.py")
+    assert matcher.is_excluded("b.c")
+    assert not matcher.is_excluded("a.c")
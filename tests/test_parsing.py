@@ -26,7 +26,7 @@ def test_parser_initialization():
 
 def test_parser_basic_todo_parsing():
     """Test parsing basic TODO comments"""
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.php', delete=False) as f:
         f.write("# TODO: This is a test todo\n")
         f.write("// FIXME: This needs to be fixed\n")
         f.write("/* BUG: There is a bug here */\n")
@@ -42,7 +42,7 @@ def test_parser_basic_todo_parsing():
             assert todos[0].tag == "TODO"
             assert todos[0].text == "This is a test todo"
             assert todos[0].linepos == 1
-            assert todos[0].file_name.endswith(".py")
+            assert todos[0].file_name.endswith(".php")
 
             # Check FIXME
             assert todos[1].tag == "FIXME"
@@ -60,7 +60,7 @@ def test_parser_basic_todo_parsing():
 
 def test_parser_with_associates():
     """Test parsing TODOs with associates/assignees"""
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
         f.write("# TODO(john, jane): Fix this issue\n")
         f.write("// FIXME(alice) - Update documentation\n")
         f.write("/* TODO: No assignee here */\n")
@@ -74,17 +74,17 @@ def test_parser_with_associates():
 
             # Check TODO with associates
             assert todos[0].tag == "TODO"
-            assert todos[0].associates == ["john", "jane"]
+            assert todos[0].associates == ("john", "jane")
             assert todos[0].text == "Fix this issue"
 
             # Check FIXME with single associate
             assert todos[1].tag == "FIXME"
-            assert todos[1].associates == ["alice"]
+            assert todos[1].associates == ("alice",)
             assert todos[1].text == "Update documentation"
 
             # Check TODO without associates (note: */ is part of text)
             assert todos[2].tag == "TODO"
-            assert todos[2].associates == [""]
+            assert todos[2].associates == ()
             assert todos[2].text == "No assignee here */"
 
         finally:
@@ -93,7 +93,7 @@ def test_parser_with_associates():
 
 def test_parser_different_comment_styles():
     """Test parsing different comment styles"""
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
         f.write("# TODO: Hash style comment\n")
         f.write("// TODO: Double slash comment\n")
         f.write("/* TODO: Block comment */\n")
@@ -183,3 +183,216 @@ def test_parser_no_matches():
 
         finally:
             os.unlink(f.name)
+
+
+def test_parser_parallel_matches_serial():
+    """Test that parsing with multiple processes gives the same todos as parsing serially"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        files = []
+        for i in range(12):
+            path = os.path.join(tmpdir, f"file{i}.py")
+            with open(path, 'w') as f:
+                f.write(f"# TODO(dev{i}): Todo number {i}\n")
+                f.write("x = 42\n")
+                f.write(f"# FIXME: Fix number {i}\n")
+            files.append(path)
+
+        serial = Parser(files).parse()
+
+        parser = Parser(files, jobs=2)
+        parser.parallel_threshold = 0
+        parallel = parser.parse()
+
+        assert len(parallel) == 24
+        assert [repr(t) for t in parallel] == [repr(t) for t in serial]
+
+
+def test_parser_jobs():
+    """Test how the number of jobs is resolved"""
+    assert Parser([]).jobs == 1
+    assert Parser([], jobs=4).jobs == 4
+    assert Parser([], jobs=0).jobs == (os.cpu_count() or 1)
+
+
+def test_parser_iter_parse_streams():
+    """Test that iter_parse yields todos lazily without storing them"""
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
+        f.write("# TODO: First\n")
+        f.write("# TODO: Second\n")
+        f.flush()
+
+        try:
+            parser = Parser(iter([f.name]))
+            todos = parser.iter_parse()
+
+            assert next(todos).text == "First"
+            assert next(todos).text == "Second"
+            assert parser.todos == []
+
+        finally:
+            os.unlink(f.name)
+
+
+def test_parser_buffer_scan_matches_line_scan():
+    """Test that scanning whole files gives the same todos as scanning line by line"""
+    from unittest.mock import patch
+
+    from todot.parser import _parse_lines
+
+    content = (
+        "x = 1\r\n"
+        "# TODO(john): Windows line ending\r\n"
+        "#\n"
+        "TODO: Not a comment on this line\n"
+        "// FIXME: First // TODO: Second on the same line\n"
+        "\r"
+        "   /* BUG  :  Spaced out */   \n"
+        "# todo\n"
+        "- not a separator on the previous line\n"
+        "-- HACK ~ Last line without newline"
+    )
+    with tempfile.NamedTemporaryFile(mode='wb', suffix='.txt', delete=False) as f:
+        f.write(content.encode("utf-8"))
+        f.flush()
+
+        try:
+            parser = Parser([f.name])
+            expected = _parse_lines(parser.regex, content.replace("\r\n", "\n").replace("\r", "\n"))
+            todos = parser.parse()
+
+            assert [(t.linepos, t.tag, t.text) for t in todos] == [(r[0], r[1], r[3]) for r in expected]
+            assert [t.linepos for t in todos] == [2, 5, 7, 10]
+
+            with patch('todot.parser.MMAP_THRESHOLD', 1):
+                mapped = Parser([f.name]).parse()
+            assert [repr(t) for t in mapped] == [repr(t) for t in todos]
+
+        finally:
+            os.unlink(f.name)
+
+
+def test_parser_prefilter():
+    """Test that files without any tags are skipped before being decoded"""
+    with tempfile.NamedTemporaryFile(mode='wb', suffix='.py', delete=False) as f:
+        f.write(b"\xff\xfe no tags in here\n")
+        f.flush()
+
+        try:
+            parser = Parser([f.name])
+            assert parser.prefilter.search(b"a todo") is not None
+            assert parser.parse() == []
+            assert Parser([], tags=["NÖTE"]).prefilter is None
+
+        finally:
+            os.unlink(f.name)
+
+
+def test_todos_are_compact():
+    """Test that todos from the same file share their file name and don't keep the match"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "test.py")
+        with open(path, 'w') as f:
+            f.write("# TODO(john): First\n# TODO(john): Second\n# TODO: Third\n")
+
+        todos = Parser([path]).parse()
+
+        assert not hasattr(todos[0], "__dict__")
+        assert todos[0].file_name is todos[1].file_name
+        assert todos[0].associates is todos[1].associates
+        assert todos[2].associates == ()
+
+
+def test_parser_streams_oversized_files():
+    """Test that streaming files in small chunks gives the same todos as reading them at once"""
+    from unittest.mock import patch
+
+    content = (
+        "x = 1\r\n"
+        "# TODO(john): Windows line ending ünïcode\r\n"
+        "\r"
+        "// FIXME: Old mac line ending\r"
+        "# BUG: Form\x0cfeed\n"
+        "-- HACK ~ Last line without newline"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "test.txt")
+        with open(path, 'wb') as f:
+            f.write(content.encode("utf-8"))
+
+        todos = Parser([path]).parse()
+        assert len(todos) == 4
+        for chunk_size in (1, 2, 3, 7, 64):
+            with patch('todot.parser.SNIFF_SIZE', chunk_size), patch('todot.parser.STREAM_CHUNK_SIZE', chunk_size):
+                parser = Parser([path], max_file_size=0)
+                streamed = parser.parse()
+            assert [repr(t) for t in streamed] == [repr(t) for t in todos]
+            assert parser.replaced == 0
+
+        parser = Parser([path], max_file_size=10, oversized="skip")
+        assert parser.parse() == []
+        assert parser.skipped["oversized"] == 1
+
+
+def test_parser_reads_dirty_files():
+    """Test that binary files are skipped and files in other encodings don't stop the parsing"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        files = {
+            "binary.py": b"\x00\x01# TODO: In a binary file\n",
+            "latin1.py": "# TODO: Café\n".encode("latin-1"),
+            "utf16.py": "# TODO: Wide\n".encode("utf-16"),
+            "bom.py": "# TODO: Marked\n".encode("utf-8-sig"),
+        }
+        paths = []
+        for name, content in files.items():
+            paths.append(os.path.join(tmpdir, name))
+            with open(paths[-1], 'wb') as f:
+                f.write(content)
+        paths.append(os.path.join(tmpdir, "missing.py"))
+
+        parser = Parser(paths)
+        todos = parser.parse()
+
+        assert [t.text for t in todos] == ["Caf�", "Wide", "Marked"]
+        assert parser.skipped == {"binary": 1, "unreadable": 1}
+        assert parser.replaced == 1
+
+
+def test_parser_language_comments():
+    """Test that files of known languages only match their own comment syntax"""
+    content = (
+        "# TODO: Hash\n"
+        "// TODO: Double slash\n"
+        "/* TODO: Block */\n"
+        "x = y -- TODO: Double dash\n"
+        "; TODO: Semicolon\n"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        texts = {}
+        for name in ("test.py", "test.c", "test.sql", "test.unknown"):
+            path = os.path.join(tmpdir, name)
+            with open(path, 'w') as f:
+                f.write(content)
+            texts[name] = [t.text for t in Parser([path]).parse()]
+
+        assert texts["test.py"] == ["Hash"]
+        assert texts["test.c"] == ["Double slash", "Block */"]
+        assert texts["test.sql"] == ["Block */", "Double dash"]
+        assert len(texts["test.unknown"]) == 5
+
+
+def test_parser_embedded_language_comments():
+    """Test that comments of languages embedded in HTML and PHP files are found"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        html = os.path.join(tmpdir, "test.html")
+        with open(html, 'w') as f:
+            f.write(
+                "<script>// TODO: Script</script>\n"
+                "<style>/* FIXME: Style */</style>\n"
+                "<!-- TODO: Markup -->\n"
+            )
+        php = os.path.join(tmpdir, "test.php")
+        with open(php, 'w') as f:
+            f.write("<?php // TODO: Code ?>\n<!-- TODO: Template -->\n")
+
+        assert [t.tag for t in Parser([html]).parse()] == ["TODO", "FIXME", "TODO"]
+        assert len(Parser([php]).parse()) == 2
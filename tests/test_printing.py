@@ -1,13 +1,26 @@
 """Tests for the Printer classes"""
+import io
+import json
+import select
+import subprocess
+import sys
 import tempfile
 import os
 from unittest.mock import patch, MagicMock
+
+import pytest
+
 from todot.printer import (
     ConsolePrinter, ColoredConsolePrinter, TextFilePrinter,
-    MarkdownFilePrinter, GithubFlavouredMarkdownFilePrinter
+    MarkdownFilePrinter, GithubFlavouredMarkdownFilePrinter,
+    NdjsonPrinter, SarifPrinter
 )
+from todot.printer import rich
 from todot.todo import Todo
 
+# The directory todot is imported from in subprocesses
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 
 def create_mock_todo(tag="TODO", text="Test todo", file_name="test.py", linepos=1, associates=None):
     """Helper function to create a mock Todo object"""
@@ -18,13 +31,7 @@ def create_mock_todo(tag="TODO", text="Test todo", file_name="test.py", linepos=
         "associates": ",".join(associates) if associates else ""
     }.get(key, "")
 
-    todo = Todo(mock_match, file_name=file_name, linepos=linepos)
-    if associates:
-        todo.associates = associates
-    else:
-        todo.associates = [""]
-
-    return todo
+    return Todo(mock_match, file_name=file_name, linepos=linepos)
 
 
 def test_console_printer_initialization():
@@ -53,11 +60,13 @@ def test_console_printer_format_and_print():
     ]
     printer = ConsolePrinter(todos)
 
-    with patch('builtins.print') as mock_print:
+    with patch('sys.stdout', new_callable=io.StringIO) as mock_stdout:
         printer.print()
 
-        # Verify print was called (format() should be called inside print())
-        assert mock_print.call_count >= 2  # At least 2 todos printed
+    lines = mock_stdout.getvalue().splitlines()
+    assert len(lines) == 2
+    assert lines[0].startswith("file1.py:1") and lines[0].endswith("TODO: First todo")
+    assert lines[1].endswith("FIXME: Second todo")
 
 
 def test_console_printer_with_associates():
@@ -261,3 +270,155 @@ def test_printer_default_filenames():
             printer.print()
             # Should use default filename
             mock_open.assert_called_with("TODO.md", "w", encoding="utf-8")
+
+
+def test_console_printer_streamed_todos():
+    """Test ConsolePrinter with todos from a generator"""
+    todos = [
+        create_mock_todo(tag="TODO", text="First todo", file_name="a.py", linepos=1),
+        create_mock_todo(tag="FIXME", text="Second todo", file_name="longer/b.py", linepos=10)
+    ]
+    printer = ConsolePrinter(iter(todos))
+    printer.format()
+
+    expected = ConsolePrinter(todos)
+    expected.format()
+
+    assert printer.to_print == expected.to_print
+
+
+def test_console_printer_streamed_padding_grows():
+    """Test that padding only grows past the look-ahead window"""
+    todos = [
+        create_mock_todo(file_name="a.py", linepos=1),
+        create_mock_todo(file_name="much/longer/name.py", linepos=1),
+        create_mock_todo(file_name="b.py", linepos=1),
+    ]
+    printer = ConsolePrinter(iter(todos))
+    printer.lookahead = 1
+    printer.format()
+
+    assert printer.to_print[0].startswith("a.py:1  TODO")
+    assert printer.to_print[2].index("TODO") == printer.to_print[1].index("TODO")
+
+
+def test_console_printer_streamed_empty():
+    """Test ConsolePrinter with an empty generator"""
+    printer = ConsolePrinter(iter([]))
+
+    with patch('builtins.print') as mock_print:
+        printer.print()
+        mock_print.assert_called_with("No todos found.")
+
+
+def test_console_printer_writes_buffer():
+    """Test that printing writes encoded chunks straight to the binary buffer of stdout"""
+    todos = [create_mock_todo(text=f"Todo {i} ünïcode", linepos=i) for i in range(1, 2001)]
+    stdout = io.TextIOWrapper(io.BytesIO(), encoding="utf-8", newline="\n")
+
+    with patch('sys.stdout', stdout), patch('todot.printer.CHUNK_SIZE', 1000):
+        ConsolePrinter(todos).print()
+
+    lines = stdout.buffer.getvalue().decode("utf-8").splitlines()
+    assert len(lines) == 2000
+    assert lines[-1].endswith("TODO: Todo 2000 ünïcode")
+
+
+def test_colored_console_printer_not_a_terminal():
+    """Test that colours are turned off when stdout is not a terminal"""
+    todos = [create_mock_todo(text="Use [bold]markup[/bold]")]
+
+    with patch('sys.stdout', new_callable=io.StringIO) as mock_stdout:
+        ColoredConsolePrinter(todos).print()
+
+    assert mock_stdout.getvalue() == "test.py:1  TODO: Use [bold]markup[/bold]\n"
+
+
+def test_colored_console_printer_escapes_markup():
+    """Test that rich markup in todos is escaped"""
+    todo = create_mock_todo(text="Use [bold]markup[/bold]")
+    printer = ColoredConsolePrinter([todo])
+    printer.format()
+
+    if rich:
+        assert "\\[bold]markup" in printer.to_print[0]
+
+
+def test_ndjson_printer():
+    """Test that NdjsonPrinter prints a JSON object per todo with stable fingerprints"""
+    todos = [
+        create_mock_todo(tag="TODO", text="Same", file_name="a.py", linepos=1, associates=["john"]),
+        create_mock_todo(tag="TODO", text="Same", file_name="a.py", linepos=2),
+        create_mock_todo(tag="FIXME", text="Other", file_name="b.py", linepos=3),
+    ]
+    with patch('sys.stdout', new_callable=io.StringIO) as mock_stdout:
+        NdjsonPrinter(iter(todos)).print()
+
+    objects = [json.loads(line) for line in mock_stdout.getvalue().splitlines()]
+    assert [(o["file"], o["line"], o["tag"], o["text"]) for o in objects] == [
+        ("a.py", 1, "TODO", "Same"), ("a.py", 2, "TODO", "Same"), ("b.py", 3, "FIXME", "Other")
+    ]
+    assert objects[0]["associates"] == ["john"]
+    assert objects[0]["fingerprint"] != objects[1]["fingerprint"]
+
+    # Moving a todo to another line keeps its fingerprint
+    moved = [create_mock_todo(tag="TODO", text="Same  ", file_name="a.py", linepos=10)]
+    assert [line for line in NdjsonPrinter(moved).iter_format()][0].endswith(
+        f'"fingerprint": "{objects[0]["fingerprint"]}"}}'
+    )
+
+
+def test_sarif_printer():
+    """Test that SarifPrinter writes a valid SARIF log"""
+    todos = [
+        create_mock_todo(tag="todo", text="First", file_name="src/a.py", linepos=4, associates=["john"]),
+        create_mock_todo(tag="FIXME", text="Second", file_name="b.py", linepos=1),
+    ]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "todos.sarif")
+        SarifPrinter(todos, path).print()
+        with open(path) as f:
+            log = json.load(f)
+
+        empty = os.path.join(tmpdir, "empty.sarif")
+        SarifPrinter([], empty).print()
+        with open(empty) as f:
+            assert json.load(f)["runs"][0]["results"] == []
+
+    assert log["version"] == "2.1.0"
+    results = log["runs"][0]["results"]
+    assert [r["ruleId"] for r in results] == ["TODO", "FIXME"]
+    location = results[0]["locations"][0]["physicalLocation"]
+    assert location["artifactLocation"]["uri"] == "src/a.py"
+    assert location["region"]["startLine"] == 4
+    assert results[0]["properties"]["associates"] == ["john"]
+    assert results[0]["partialFingerprints"]["todot/v1"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="pipes can't be selected on windows")
+def test_ndjson_printer_streams_to_pipes():
+    """Test that the first todo can be read from a pipe before the rest of the todos are found"""
+    script = (
+        "import sys\n"
+        "from todot.printer import NdjsonPrinter\n"
+        "from todot.todo import Todo\n"
+        "def todos():\n"
+        "    yield Todo.from_record((1, 'TODO', '', 'First'), file_name='a.py')\n"
+        "    sys.stdin.readline()\n"
+        "    yield Todo.from_record((2, 'TODO', '', 'Second'), file_name='a.py')\n"
+        "NdjsonPrinter(todos()).print()\n"
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-c", script], stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=ROOT
+    )
+    try:
+        # The second todo is only found once the first one was read, so a buffered first line never arrives
+        assert select.select([process.stdout], [], [], 10)[0], "the first todo wasn't written on its own"
+        assert json.loads(process.stdout.readline())["text"] == "First"
+        process.stdin.write(b"\n")
+        process.stdin.close()
+        assert json.loads(process.stdout.readline())["text"] == "Second"
+    finally:
+        process.kill()
+        process.wait()
+        process.stdout.close()
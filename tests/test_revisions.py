@@ -0,0 +1,52 @@
+"""Tests for reading the files of git revisions"""
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest.mock import patch
+
+import pytest
+
+from todot import Scanner
+from todot.revision import Repository
+
+
+def test_scan_revisions():
+    """Test that files are read from several revisions and files the revisions share are only read once"""
+    if shutil.which("git") is None:
+        pytest.skip("git is not installed")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        def git(*args):
+            subprocess.run(
+                ["git", "-C", tmpdir, "-c", "user.name=Jane", "-c", "user.email=jane@example.com", *args],
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+
+        git("init", "-q")
+        git("checkout", "-q", "-b", "main")
+        with open(os.path.join(tmpdir, "shared.py"), "w") as f:
+            f.write("# TODO: Shared\n")
+        with open(os.path.join(tmpdir, "notes.txt"), "w") as f:
+            f.write("TODO: Not source\n")
+        git("add", ".")
+        git("commit", "-q", "-m", "Add")
+        git("checkout", "-q", "-b", "feature")
+        with open(os.path.join(tmpdir, "new.py"), "w") as f:
+            f.write("# FIXME: New\n")
+        git("add", ".")
+        git("commit", "-q", "-m", "New")
+        # The working tree isn't read
+        os.remove(os.path.join(tmpdir, "shared.py"))
+
+        with patch.object(Repository, "read_blob", autospec=True, side_effect=Repository.read_blob) as read_blob:
+            todos = list(Scanner().scan_revisions(["main", "feature", "no-such-ref"], tmpdir))
+        assert [(os.path.relpath(t.file_name.partition(":")[2], tmpdir), t.tag, t.text) for t in todos] == [
+            ("shared.py", "TODO", "Shared"),
+            ("new.py", "FIXME", "New"),
+            ("shared.py", "TODO", "Shared"),
+        ]
+        assert [t.file_name.partition(":")[0] for t in todos] == ["main", "feature", "feature"]
+        assert read_blob.call_count == 2
@@ -0,0 +1,88 @@
+"""Tests for the Scanner class"""
+import os
+import tempfile
+import threading
+
+from todot import Scanner
+from todot.cli import read_roots
+from todot.parser import Parser
+
+
+def create_tree(tmpdir):
+    os.makedirs(os.path.join(tmpdir, "build"))
+    with open(os.path.join(tmpdir, "main.py"), "w") as f:
+        f.write("# TODO: First\n# NOTE: Second\n")
+    with open(os.path.join(tmpdir, "build", "out.py"), "w") as f:
+        f.write("# TODO: Built\n")
+
+
+def test_scanner_scan():
+    """Test scanning directories and files with a scanner's configuration"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        create_tree(tmpdir)
+        exclude = ["build"]
+        scanner = Scanner(tags=["TODO", "NOTE"], exclude=exclude)
+        assert exclude == ["build"]
+        assert [t.text for t in scanner.scan(tmpdir)] == ["First", "Second"]
+        # Scanning again gives the same todos instead of adding to the last scan
+        assert [t.text for t in scanner.scan(tmpdir)] == ["First", "Second"]
+        main = os.path.join(tmpdir, "main.py")
+        assert [t.text for t in scanner.scan([main, os.path.join(tmpdir, "build")])] == ["First", "Second", "Built"]
+        # Excluded files are still parsed when they are asked for directly
+        assert [t.text for t in scanner.scan_file(os.path.join(tmpdir, "build", "out.py"))] == ["Built"]
+
+
+def test_scanner_threads():
+    """Test that one scanner can be used from several threads at once"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        create_tree(tmpdir)
+        scanner = Scanner()
+        results = []
+
+        def scan():
+            results.append(sorted(t.text for t in scanner.scan(tmpdir)))
+
+        threads = [threading.Thread(target=scan) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [["Built", "First"]] * 8
+
+
+def test_parser_parse_twice():
+    """Test that parsing again doesn't duplicate the todos"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        create_tree(tmpdir)
+        parser = Parser([os.path.join(tmpdir, "main.py")])
+        assert len(parser.parse()) == 1
+        assert len(parser.parse()) == 1
+        assert Parser([]).regex is parser.regex
+
+
+def test_scanner_several_roots():
+    """Test that several roots are scanned in order and that a file found from two of them is parsed once"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        create_tree(tmpdir)
+        os.makedirs(os.path.join(tmpdir, "other"))
+        with open(os.path.join(tmpdir, "other", "other.py"), "w") as f:
+            f.write("# TODO: Other\n")
+        os.symlink(os.path.join(tmpdir, "build"), os.path.join(tmpdir, "other", "build"))
+
+        scanner = Scanner(jobs=2)
+        roots = [os.path.join(tmpdir, "other"), tmpdir]
+        todos = [t.text for t in scanner.scan(roots)]
+        assert todos[:2] == ["Other", "Built"] or todos[:2] == ["Built", "Other"]
+        assert todos[2:] == ["First"]
+
+
+def test_read_roots():
+    """Test reading the roots listed in a file"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        roots_file = os.path.join(tmpdir, "roots.txt")
+        with open(roots_file, "w") as f:
+            f.write("services/a\n\n# services/b\n  services/c  \n")
+        assert read_roots(roots_file) == [
+            os.path.join(tmpdir, "services/a"),
+            os.path.join(tmpdir, "services/c"),
+        ]
@@ -0,0 +1,125 @@
+"""Tests for the TodoServer class"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+
+from todot.__main__ import create_subcommand_scanner
+from todot.cli import create_serve_argparser
+from todot.finder import Finder
+from todot.parser import Parser
+from todot.server import TodoServer, query
+
+
+def create_server(tmpdir):
+    """Creates a server for a directory with a couple of todos"""
+    with open(os.path.join(tmpdir, "a.py"), 'w') as f:
+        f.write("# TODO(john): First\n# FIXME: Second\n")
+    os.makedirs(os.path.join(tmpdir, "sub"))
+    with open(os.path.join(tmpdir, "sub", "b.py"), 'w') as f:
+        f.write("# TODO: Third\n")
+    finder = Finder(path=tmpdir, git_files=False)
+    return TodoServer([finder], Parser([]), polling=True, interval=0.01)
+
+
+def test_server_query():
+    """Test filtering the todos held by the server"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        server = create_server(tmpdir)
+
+        assert sorted(t["text"] for t in server.query()) == ["First", "Second", "Third"]
+        assert [t["text"] for t in server.query(tag="todo", associate="john")] == ["First"]
+        assert [t["text"] for t in server.query(path=os.path.join(tmpdir, "sub"))] == ["Third"]
+        assert len(server.query(root=tmpdir)) == 3
+        assert "error" in server.handle({"root": "missing"})
+        server.shutdown()
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="unix sockets are not supported")
+def test_server_unix_socket():
+    """Test querying a running server over a unix socket"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        server = create_server(tmpdir)
+        socket_path = os.path.join(tmpdir, "todot.sock")
+        thread = threading.Thread(target=server.serve_unix, args=(socket_path,), daemon=True)
+        thread.start()
+        try:
+            # The socket file exists as soon as it is bound, which is a moment before it accepts connections
+            for _ in range(100):
+                response = query({"tag": "FIXME"}, socket_path=socket_path)
+                if response is not None:
+                    break
+                time.sleep(0.01)
+            assert [t["text"] for t in response["todos"]] == ["Second"]
+            assert response["todos"][0]["line"] == 2
+        finally:
+            server.shutdown()
+            thread.join(5)
+        assert not os.path.exists(socket_path)
+
+
+def test_query_without_server():
+    """Test that querying returns None when no server is running"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        assert query({}, socket_path=os.path.join(tmpdir, "missing.sock")) is None
+
+
+def test_server_query_while_updating():
+    """Test that queries keep being answered while files get their first todo or lose their last one"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        server = create_server(tmpdir)
+        watcher = server.watchers[tmpdir]
+        stopped = threading.Event()
+
+        def change():
+            for i in range(200):
+                path = os.path.join(tmpdir, f"new{i % 10}.py")
+                if os.path.exists(path):
+                    os.unlink(path)
+                else:
+                    with open(path, 'w') as f:
+                        f.write("# TODO: New\n")
+                watcher.update({path})
+            stopped.set()
+
+        thread = threading.Thread(target=change, daemon=True)
+        thread.start()
+        try:
+            while not stopped.is_set():
+                assert {"First", "Second", "Third"} <= {t["text"] for t in server.query()}
+        finally:
+            thread.join(5)
+            server.shutdown()
+
+
+def test_subcommands_use_config():
+    """Test that todot serve and todot query without a server use the config file the same way as todot"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with open(os.path.join(tmpdir, ".todotrc"), 'w') as f:
+            f.write("[TODOT]\ntags = NOTE\nignore = skip.py\nno_cache = yes\n")
+        with open(os.path.join(tmpdir, "a.py"), 'w') as f:
+            f.write("# NOTE: Configured\n")
+        with open(os.path.join(tmpdir, "skip.py"), 'w') as f:
+            f.write("# NOTE: Skipped\n")
+
+        args = create_serve_argparser().parse_args(["--configfile", os.path.join(tmpdir, ".todotrc")])
+        scanner = create_subcommand_scanner(args)
+        assert scanner.tags == ("NOTE",)
+        assert "skip.py" in scanner.exclude
+        assert scanner.cache is None
+
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run(
+            [sys.executable, "-m", "todot", "query", "--socket", os.path.join(tmpdir, "missing.sock")],
+            cwd=tmpdir,
+            env=dict(os.environ, PYTHONPATH=root),
+            stdout=subprocess.PIPE,
+            check=True,
+        ).stdout
+        assert [t["text"] for t in json.loads(output)["todos"]] == ["Configured"]
@@ -0,0 +1,44 @@
+"""Tests for how long todot takes to start"""
+import subprocess
+import sys
+
+# Modules that are slow to import and only needed by some options
+LAZY_MODULES = ("rich", "pathspec", "sqlite3", "configparser", "json", "hashlib")
+# The most todot may take to import, in microseconds, about twice what it takes so that slower machines pass
+IMPORT_BUDGET = 100_000
+
+
+def _import_times():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "todot", "--version"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    imported, times = set(), {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        imported.add(name.strip())
+        # Nested imports are indented and already counted in the cumulative time of the module importing them
+        if not name.startswith("  "):
+            times[name.strip()] = int(cumulative)
+    return imported, times
+
+
+def test_startup_lazy_imports():
+    """Test that modules only needed by some options aren't imported when they aren't used"""
+    imported, _ = _import_times()
+    for module in LAZY_MODULES:
+        assert module not in imported, f"{module} is imported on startup"
+
+
+def test_startup_import_budget():
+    """Test that importing todot stays within its budget"""
+    _, times = _import_times()
+    total = sum(j for i, j in times.items() if i == "todot" or i.startswith("todot."))
+    assert total < IMPORT_BUDGET, f"todot took {total / 1000:.1f}ms to import"
@@ -0,0 +1,61 @@
+"""Tests for the Stats class"""
+import os
+import tempfile
+import time
+
+from todot.finder import Finder
+from todot.parser import Parser
+from todot.stats import Stats
+
+
+def test_stats_nested_phases():
+    """Test that nested phases don't count towards the phase around them"""
+    stats = Stats()
+    with stats.phase("output"):
+        time.sleep(0.01)
+        with stats.phase("format"):
+            time.sleep(0.05)
+    assert stats.wall["format"] >= 0.05
+    assert 0.01 <= stats.wall["output"] < 0.05
+
+    def numbers():
+        time.sleep(0.02)
+        yield 1
+
+    assert list(stats.iter_phase(numbers(), "walk")) == [1]
+    assert stats.wall["walk"] >= 0.02
+
+
+def test_stats_slowest_files():
+    """Test that only the slowest files are kept"""
+    stats = Stats(top=2)
+    for i, seconds in enumerate([0.3, 0.1, 0.5, 0.2]):
+        stats.file(f"file{i}", seconds)
+    assert [i["file"] for i in stats.to_dict()["slowest_files"]] == ["file2", "file0"]
+
+
+def test_stats_counters():
+    """Test the counters collected while finding and parsing"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.makedirs(os.path.join(tmpdir, "sub"))
+        for name, content in [("a.py", "# TODO: First\n# TODO: Second\n"), ("b.py", "x = 1\n"), ("c.txt", "")]:
+            with open(os.path.join(tmpdir, "sub", name), 'w') as f:
+                f.write(content)
+        with open(os.path.join(tmpdir, "binary.py"), 'wb') as f:
+            f.write(b"\0# TODO: Binary\n")
+
+        stats = Stats()
+        finder = Finder(tmpdir, git_files=False, stats=stats)
+        todos = Parser(stats.iter_phase(finder.iter_find(), "walk"), stats=stats).parse()
+
+        assert len(todos) == 2
+        counters = stats.to_dict()["counters"]
+        assert counters["directories"] == 2
+        assert counters["considered"] == 5
+        assert counters["ignored"] == 1
+        assert counters["read"] == 2
+        assert counters["skipped"] == 1
+        assert counters["matched"] == 1
+        assert counters["todos"] == 2
+        assert counters["bytes"] == 29 + 6 + 16
+        assert stats.wall["read"] > 0 and stats.wall["walk"] > 0
@@ -0,0 +1,84 @@
+"""Tests for the TodoStore class"""
+import os
+import tempfile
+
+import pytest
+
+from todot.parser import Parser
+from todot.printer import ConsolePrinter
+
+
+def create_store(tmpdir):
+    """Parses a couple of files into a store"""
+    files = []
+    for name, content in [
+        ("a.py", "# TODO(john, jane): First\n# FIXME: Second\n"),
+        (os.path.join("sub", "b.py"), "# todo(jane): Third\n" + "\n" * 120 + "# BUG: Fourth ünïcode\n"),
+    ]:
+        path = os.path.join(tmpdir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding="utf-8") as f:
+            f.write(content)
+        files.append(path)
+    return files, Parser(files).parse_store()
+
+
+def test_store_matches_parser():
+    """Test that a store holds the same todos as parsing them normally"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        files, store = create_store(tmpdir)
+        todos = Parser(files).parse()
+
+        assert len(store) == 4
+        assert [repr(t) for t in store] == [repr(t) for t in todos]
+        assert store.todo(3).text == "Fourth ünïcode"
+        assert store.name_width == max(len(f"{t.file_name}:{t.linepos} ") for t in todos)
+
+
+def test_store_filter():
+    """Test filtering a store by tag, associate and path"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _, store = create_store(tmpdir)
+
+        assert [t.text for t in store.filter(tag="TODO")] == ["First", "Third"]
+        assert [t.text for t in store.filter(associate="jane")] == ["First", "Third"]
+        assert [t.text for t in store.filter(tag="todo", associate="john")] == ["First"]
+        assert [t.text for t in store.filter(path_prefix=os.path.join(tmpdir, "sub"))] == ["Third", "Fourth ünïcode"]
+        assert [t.text for t in store.filter(associate="jane").filter(path_prefix=tmpdir + "/sub")] == ["Third"]
+        assert len(store.filter(associate="nobody")) == 0
+        assert store.filter() is store
+
+
+def test_store_group_by():
+    """Test grouping a store"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _, store = create_store(tmpdir)
+
+        by_tag = store.group_by("tag")
+        assert {tag: len(todos) for tag, todos in by_tag.items()} == {"TODO": 1, "FIXME": 1, "todo": 1, "BUG": 1}
+        by_associate = store.filter(tag="todo").group_by("associate")
+        assert {name: [t.text for t in todos] for name, todos in by_associate.items()} == {
+            "john": ["First"],
+            "jane": ["First", "Third"],
+        }
+        assert [len(todos) for todos in store.group_by("file").values()] == [2, 2]
+        with pytest.raises(ValueError):
+            store.group_by("text")
+
+
+def test_printing_store():
+    """Test that printers use the width precomputed by a store"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        files, store = create_store(tmpdir)
+
+        printer = ConsolePrinter(store)
+        printer.format()
+        expected = ConsolePrinter(Parser(files).parse())
+        expected.format()
+        assert printer.to_print == expected.to_print
+
+        view = store.filter(tag="FIXME")
+        printer = ConsolePrinter(view)
+        printer.format()
+        assert len(printer.to_print) == 1
+        assert view.name_width == len(f"{store.todo(1).file_name}:2 ")
@@ -0,0 +1,116 @@
+"""Tests for the Watcher class"""
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from todot.finder import Finder
+from todot.parser import Parser
+from todot.watcher import InotifyWatcher, PollingWatcher, TodoIndex, Watcher
+
+
+def write(path, content):
+    """Writes a file, making its directory if needed"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def create_watcher(tmpdir, polling, gitignore=False):
+    """Creates a watcher for a directory"""
+    finder = Finder(path=tmpdir, gitignore=gitignore, git_files=False)
+    return Watcher(finder, Parser([]), polling=polling, interval=0.01, debounce=0.05)
+
+
+def test_todo_index():
+    """Test replacing and removing the todos of files"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "test.py")
+        write(path, "# TODO: First\n# TODO: Second\n")
+        parser = Parser([])
+        index = TodoIndex()
+
+        _, todos = next(parser.iter_parse_files([path]))
+        added, removed = index.set(path, todos)
+        assert [t.text for t in added] == ["First", "Second"]
+        assert removed == []
+        assert len(index) == 2
+
+        write(path, "# TODO: First\n# TODO: Third\n")
+        _, todos = next(parser.iter_parse_files([path]))
+        added, removed = index.set(path, todos)
+        assert [t.text for t in added] == ["Third"]
+        assert [t.text for t in removed] == ["Second"]
+
+        assert [t.text for t in index.remove_tree(tmpdir)] == ["First", "Third"]
+        assert len(index) == 0
+
+
+@pytest.mark.parametrize("polling", [True, False])
+def test_watcher_updates(polling):
+    """Test that created, modified and deleted files are noticed"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        kept = os.path.join(tmpdir, "kept.py")
+        changed = os.path.join(tmpdir, "changed.py")
+        write(kept, "# TODO: Kept\n")
+        write(changed, "# TODO: Before\n")
+        try:
+            watcher = create_watcher(tmpdir, polling)
+        except OSError:
+            pytest.skip("inotify is not available")
+        if not polling and not isinstance(watcher.source, InotifyWatcher):
+            pytest.skip("inotify is not available")
+        if polling:
+            assert isinstance(watcher.source, PollingWatcher)
+        assert sorted(t.text for t in watcher.index) == ["Before", "Kept"]
+        updates = iter(watcher)
+
+        write(changed, "# TODO: After and longer\n")
+        added, removed = next(updates)
+        assert [t.text for t in added] == ["After and longer"]
+        assert [t.text for t in removed] == ["Before"]
+
+        write(os.path.join(tmpdir, "new", "created.py"), "# FIXME: Created\n")
+        added, removed = next(updates)
+        assert [t.text for t in added] == ["Created"]
+        assert removed == []
+
+        shutil.rmtree(os.path.join(tmpdir, "new"))
+        os.unlink(changed)
+        added, removed = next(updates)
+        assert sorted(t.text for t in removed) == ["After and longer", "Created"]
+        assert [t.text for t in watcher.index] == ["Kept"]
+        updates.close()
+
+
+@pytest.mark.parametrize("polling", [True, False])
+def test_watcher_gitignore_changes(polling):
+    """Test that changed .gitignore files are read again and directories that are no longer ignored are watched"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        write(os.path.join(tmpdir, ".gitignore"), "gen/\n")
+        write(os.path.join(tmpdir, "kept.py"), "# TODO: Kept\n")
+        write(os.path.join(tmpdir, "gen", "first.py"), "# TODO: First\n")
+        try:
+            watcher = create_watcher(tmpdir, polling, gitignore=True)
+        except OSError:
+            pytest.skip("inotify is not available")
+        if not polling and not isinstance(watcher.source, InotifyWatcher):
+            pytest.skip("inotify is not available")
+        assert [t.text for t in watcher.index] == ["Kept"]
+        updates = iter(watcher)
+
+        write(os.path.join(tmpdir, ".gitignore"), "")
+        added, removed = next(updates)
+        assert [t.text for t in added] == ["First"]
+        assert removed == []
+
+        write(os.path.join(tmpdir, "gen", "second.py"), "# TODO: Second\n")
+        added, removed = next(updates)
+        assert [t.text for t in added] == ["Second"]
+
+        write(os.path.join(tmpdir, ".gitignore"), "gen/\n")
+        added, removed = next(updates)
+        assert added == []
+        assert sorted(t.text for t in removed) == ["First", "Second"]
+        updates.close()
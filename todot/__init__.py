@@ -1,3 +1,8 @@
 """Prints todos to various outputs and formats"""
 __version__ = "0.2.0"
 __author__ = "Wasi Master"
+
+from .scanner import Scanner
+from .todo import Todo
+
+__all__ = ("Scanner", "Todo")
@@ -1,72 +1,320 @@
 """CLI"""
-import configparser
 import os
 import sys
 import time
+from argparse import ArgumentTypeError
+from itertools import chain
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 from . import __version__
-from .cli import argparser
-from .finder import Finder
-from .parser import Parser
-from .printer import (ColoredConsolePrinter, ConsolePrinter, GithubFlavouredMarkdownFilePrinter, MarkdownFilePrinter,
-                      TextFilePrinter)
-
-try:
-    import rich
-except ImportError:
-    rich = None
+from .cache import ParseCache
+from .cli import (apply_config, argparser, create_query_argparser, create_serve_argparser, file_size, read_roots,
+                  to_bool)
+from .printer import (ColoredConsolePrinter, ConsolePrinter, DeltaPrinter, GithubFlavouredMarkdownFilePrinter,
+                      MarkdownFilePrinter, NdjsonPrinter, SarifPrinter, TextFilePrinter, rich)
+from .scanner import Scanner
+from .stats import Stats, clock
+from .todo import Todo, iter_fingerprints
 
 PRINTER_MAPPING = {
     "default": ColoredConsolePrinter if rich else ConsolePrinter,
     "color": ColoredConsolePrinter,
     "markdown": MarkdownFilePrinter,
     "text": TextFilePrinter,
-    "github": GithubFlavouredMarkdownFilePrinter
+    "github": GithubFlavouredMarkdownFilePrinter,
+    "ndjson": NdjsonPrinter,
+    "sarif": SarifPrinter,
 }
 
 
+def create_printer(args, todos):
+    """Creates the printer chosen by the arguments"""
+    if args.format in ("ndjson", "sarif"):
+        return PRINTER_MAPPING[args.format](todos, file_name=args.output)
+    if args.format == "text" or args.output and args.output.endswith(".txt"):
+        return TextFilePrinter(todos, file_name=args.output)
+    if args.format == "github":
+        return GithubFlavouredMarkdownFilePrinter(todos, file_name=args.output, repo=args.repo, branch=args.branch)
+    if args.format == "markdown":
+        return MarkdownFilePrinter(todos, file_name=args.output)
+    return PRINTER_MAPPING.get(args.format, ConsolePrinter)(todos)
+
+
+def create_delta_printer(args, todos, baseline: Dict[str, Todo], changed: Optional[Set[str]]) -> DeltaPrinter:
+    """Compares the todos with the baseline and creates a printer for the todos that were added or removed"""
+    from .baseline import diff
+
+    added, removed = diff(iter_fingerprints(todos), baseline, changed)
+    print(f"{len(added)} todo(s) added and {len(removed)} removed since the baseline", file=sys.stderr)
+    return DeltaPrinter(added, removed, args.output, as_json=args.format == "ndjson")
+
+
+def report_skipped(parser):
+    """Tells how many files couldn't be read normally, on stderr so that it doesn't end up in the output"""
+    names = {"binary": "binary", "oversized": "too big", "unreadable": "unreadable"}
+    skipped = [f"{count} {names[reason]}" for reason, count in sorted(parser.skipped.items())]
+    if skipped:
+        print(f"Skipped {', '.join(skipped)} file(s)", file=sys.stderr)
+    if parser.replaced:
+        print(f"Replaced characters that couldn't be decoded in {parser.replaced} file(s)", file=sys.stderr)
+
+
+def watch(args, finder, parser):
+    """Prints the todos again, or only what changed, whenever a file changes until interrupted"""
+    from .watcher import Watcher
+
+    interval = float(args.watch_interval) if args.watch_interval is not None else 1.0
+    watcher = Watcher(finder, parser, polling=to_bool(args.watch_polling), interval=interval)
+    create_printer(args, list(watcher.index)).print()
+    delta = to_bool(args.watch_delta)
+    try:
+        for added, removed in watcher:
+            if delta:
+                for todo in removed:
+                    print(f"- {todo!r}")
+                for todo in added:
+                    print(f"+ {todo!r}")
+                continue
+            if sys.stdout.isatty() and not args.output:
+                print("\x1b[2J\x1b[H", end="")
+            create_printer(args, list(watcher.index)).print()
+    except KeyboardInterrupt:
+        pass
+
+
+def serve(argv):
+    """Runs a server that answers queries about the todos of one or more paths"""
+    from .server import TodoServer, default_socket_path
+
+    args = create_serve_argparser().parse_args(argv)
+    scanner = create_subcommand_scanner(args)
+    finders = [scanner.finder(path) for path in args.paths or ["."]]
+    interval = float(args.watch_interval)
+    server = TodoServer(finders, scanner.parser(()), polling=to_bool(args.watch_polling), interval=interval)
+    try:
+        if args.port is not None:
+            print(f"Serving todos on http://127.0.0.1:{args.port}/todos")
+            server.serve_http(args.port)
+        else:
+            socket_path = args.socket or default_socket_path()
+            print(f"Serving todos on {socket_path}")
+            server.serve_unix(socket_path)
+    except KeyboardInterrupt:
+        pass
+    except OSError as exc:
+        print(f"Failed to serve todos due to {exc}")
+    finally:
+        if scanner.cache is not None:
+            scanner.cache.close()
+
+
+def query(argv):
+    """Prints the todos matching a query as JSON, asking a running server if there is one"""
+    import json
+
+    from .server import filter_todos, query as query_server
+
+    args = create_query_argparser().parse_args(argv)
+    request = {"root": args.root, "tag": args.tag, "associate": args.associate, "path": args.path}
+    response = query_server(request, socket_path=args.socket, port=args.port)
+    if response is None:
+        scanner = create_subcommand_scanner(args)
+        todos = filter_todos(scanner.scan(args.root or "."), tag=args.tag, associate=args.associate, path=args.path)
+        response = {"todos": [i.to_dict() for i in todos]}
+        if scanner.cache is not None:
+            scanner.cache.close()
+    print(json.dumps(response, indent=2))
+
+
+def create_scanner(args) -> Scanner:
+    """Creates the scanner configured by the arguments"""
+    try:
+        max_file_size = file_size(args.max_file_size) if args.max_file_size else None
+    except ArgumentTypeError as exc:
+        argparser.error(str(exc))
+    if args.oversized not in (None, "skip", "stream"):
+        argparser.error(f"oversized has to be skip or stream, not {args.oversized}")
+    cache = None
+    if not to_bool(args.no_cache):
+        cache = ParseCache(args.cache_dir or ".todot-cache", rebuild=to_bool(args.rebuild_cache))
+    return Scanner(
+        tags=args.tags.split(",") if args.tags else None,
+        exclude=[i.strip().replace("\\", "/") for i in args.ignore.split(",")] if args.ignore else None,
+        gitignore=to_bool(args.gitignore),
+        git_files=to_bool(args.git_files) if args.git_files is not None else None,
+        walk_threads=int(args.walk_threads) if args.walk_threads is not None else None,
+        jobs=int(args.jobs) if args.jobs is not None else None,
+        cache=cache,
+        max_file_size=max_file_size,
+        oversized=args.oversized or "stream",
+    )
+
+
+def create_subcommand_scanner(args) -> Scanner:
+    """Creates the scanner of todot serve or todot query the same way as the scanner of todot itself
+
+    Their options and the config file are filled into the options of todot, so that every other option is the same
+    """
+    apply_config(args)
+    options = argparser.parse_args([])
+    for key, value in vars(args).items():
+        # The paths of the subcommands aren't the paths to search
+        if key != "path" and hasattr(options, key) and value is not None:
+            setattr(options, key, value)
+    return create_scanner(options)
+
+
+def get_roots(args) -> List[str]:
+    """Returns the paths to search, from the command line, the config file and --roots-file"""
+    # The config file gives a single path as a string
+    roots = [args.path] if isinstance(args.path, str) else list(args.path or [])
+    if args.roots_file:
+        try:
+            roots.extend(read_roots(args.roots_file))
+        except OSError as exc:
+            argparser.error(f"Failed to read the roots file due to {exc}")
+    return roots or ["."]
+
+
+def iter_todos(args, scanner: Scanner, parser, stats: Optional[Stats] = None, files=None) -> Iterator[Todo]:
+    """Yields the parsed todos, with who wrote them and when if --blame is used
+
+    ``files`` are the already parsing ``(file, todos)`` to use instead of the parser's files, such as for --rev
+    """
+    blame = to_bool(args.blame)
+    if files is None and not blame:
+        todos = parser.iter_parse()
+        return todos if stats is None else stats.iter_phase(todos, "parse")
+    if files is None:
+        files = parser.iter_parse_files(parser.files)
+    if stats is not None:
+        files = stats.iter_phase(files, "parse")
+    if not blame:
+        return (todo for _, todos in files for todo in todos)
+    from .blame import Blamer
+
+    blamer = Blamer(workers=int(args.blame_jobs) if args.blame_jobs is not None else None, cache=scanner.cache)
+    blamed = blamer.iter_blame(files)
+    if stats is not None:
+        blamed = stats.iter_phase(blamed, "blame")
+    return (todo for _, todos in blamed for todo in todos)
+
+
+def find_changed(args, scanner: Scanner, roots: List[str]) -> Tuple[List[str], Set[str]]:
+    """Returns the files to parse that changed since --changed-since and the names of every changed file
+
+    Deleted files are only in the names, so that their todos count as removed
+    """
+    from .baseline import changed_files, file_key
+
+    paths, names = [], set()
+    for root in roots:
+        finder = scanner.finder(root)
+        try:
+            changed = changed_files(root, args.changed_since)
+        except OSError as exc:
+            argparser.error(f"Failed to find the files changed since {args.changed_since} due to {exc}")
+        for path in changed:
+            name = file_key(path)
+            if name in names:
+                continue
+            names.add(name)
+            if os.path.isfile(path) and finder.accepts(path):
+                paths.append(path)
+    return paths, names
+
+
+def scan(args, stats: Optional[Stats] = None):
+    """Searches for todos and prints them"""
+    roots = get_roots(args)
+    scanner = create_scanner(args)
+    baseline = None
+    if args.baseline:
+        from .baseline import load_baseline
+
+        try:
+            baseline = load_baseline(args.baseline)
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            argparser.error(f"Failed to read the baseline due to {exc}")
+    changed = None
+    if args.rev:
+        if to_bool(args.watch) or args.changed_since:
+            argparser.error("--rev can't be used with --watch or --changed-since")
+        found = ()
+    elif args.changed_since:
+        found, changed = find_changed(args, scanner, roots)
+    else:
+        found = scanner.find(roots, stats=stats)
+    if stats is not None:
+        found = stats.iter_phase(found, "walk")
+    parser = scanner.parser(found, stats=stats)
+    files = None
+    if args.rev:
+        # Every root is read as the repository it is in, or the part of it inside the root
+        files = chain.from_iterable(parser.iter_parse_revisions(root, args.rev) for root in roots)
+    if to_bool(args.watch):
+        if len(roots) > 1:
+            argparser.error("--watch can only watch one path")
+        watch(args, scanner.finder(roots[0], stats=stats), parser)
+    else:
+        todos = iter_todos(args, scanner, parser, stats, files)
+        if baseline is None:
+            printer = create_printer(args, todos)
+        else:
+            printer = create_delta_printer(args, todos, baseline, changed)
+        if stats is None:
+            printer.print()
+        else:
+            with stats.phase("output"):
+                printer.print(stats.iter_phase(printer.iter_format(), "format"))
+        report_skipped(parser)
+    if scanner.cache is not None:
+        scanner.cache.close()
+
+
 def run():
     """Runs the CLI"""
+    if sys.argv[1:2] == ["serve"]:
+        serve(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["query"]:
+        query(sys.argv[2:])
+        return
     start = time.time()
     args = argparser.parse_args()
     if args.version:
         print(f"todot: {__version__}\npython: {sys.version}")
         return
 
-    config = configparser.ConfigParser()
-    if args.configfile:
-        config.read(args.configfile)
-    else:
-        if os.path.exists(".todotrc"):
-            config.read(".todotrc")
-        else:
-            config = {"TODOT": {}}
-    for key, value in config["TODOT"].items():
-        try:
-            provided_value = getattr(args, key)
-            if (not provided_value) or provided_value == "default":
-                setattr(args, key, value)
-        except AttributeError:
-            setattr(args, key, value)
-
-    exclude = [i.replace("\\", "/") for i in args.ignore.split(",")] if args.ignore else []
-    tags = args.tags.split(",") if args.tags else None
-    finder = Finder(args.path, exclude=exclude, gitignore=args.gitignore)
-    found = finder.find()
-    parser = Parser(found, tags=tags)
-    todos = parser.parse()
-    if args.format == "text" or args.output and args.output.endswith(".txt"):
-        printer = TextFilePrinter(todos, file_name=args.output)
-    elif args.format == "github":
-        printer = GithubFlavouredMarkdownFilePrinter(todos, file_name=args.output, repo=args.repo, branch=args.branch)
-    elif args.format == "markdown":
-        printer = MarkdownFilePrinter(todos, file_name=args.output)
+    config_wall, config_cpu = clock()
+    apply_config(args)
+
+    stats = None
+    if to_bool(args.stats) or args.stats_json:
+        stats = Stats(top=int(args.stats_top) if args.stats_top is not None else 10)
+        end_wall, end_cpu = clock()
+        stats.add("config", end_wall - config_wall, end_cpu - config_cpu)
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.runcall(scan, args, stats)
+        profiler.dump_stats(args.profile)
+        print(f"Saved the profile to {args.profile}, view it with python -m pstats {args.profile}", file=sys.stderr)
     else:
-        printer = PRINTER_MAPPING.get(args.format, ConsolePrinter)(todos)
-    printer.print()
+        scan(args, stats)
+    if stats is not None:
+        if to_bool(args.stats):
+            stats.report()
+        if args.stats_json:
+            import json
+
+            with open(args.stats_json, "w", encoding="utf-8") as f:
+                json.dump(stats.to_dict(), f, indent=2)
     end = time.time()
     if end - start > 0.5:
-        print(f"Took {round(end-start, 2)} seconds to complete")
+        # On stderr so that it doesn't end up in machine readable output
+        print(f"Took {round(end-start, 2)} seconds to complete", file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,77 @@
+"""Reads the members of tar and zip archives one at a time without extracting them"""
+from typing import BinaryIO, Callable, Iterator, Tuple
+
+__all__ = ("ARCHIVE_SUFFIXES", "archive_errors", "is_archive", "iter_members", "member_path")
+
+# The file name endings of the archives that can be read
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz", ".tbz2", ".tar.xz", ".txz", ".zip")
+# Separates the path of an archive and the path of a member inside it in reported paths
+MEMBER_SEPARATOR = "!/"
+
+
+def is_archive(path: str) -> bool:
+    """Checks whether a path is an archive from its name"""
+    return path.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def member_path(archive: str, name: str) -> str:
+    """Returns the path a member is reported under, such as ``release.tar.gz!/src/main.py``"""
+    return f"{archive}{MEMBER_SEPARATOR}{name}"
+
+
+def _clean(name: str) -> str:
+    """Removes the leading ./ and / some archivers put in front of member names"""
+    while name.startswith("./"):
+        name = name[2:]
+    return name.lstrip("/")
+
+
+def _iter_tar(path: str, accepts: Callable[[str], bool]) -> Iterator[Tuple[str, BinaryIO, int]]:
+    import tarfile
+
+    # Stream mode reads the archive from start to end once, so compressed archives are never seeked in
+    with tarfile.open(path, "r|*") as archive:
+        for member in archive:
+            # Stream mode remembers every member it has seen, which isn't needed here
+            archive.members = []
+            name = _clean(member.name)
+            if not member.isfile() or not accepts(name):
+                continue
+            yield name, archive.extractfile(member), member.size
+
+
+def _iter_zip(path: str, accepts: Callable[[str], bool]) -> Iterator[Tuple[str, BinaryIO, int]]:
+    import zipfile
+
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            name = _clean(info.filename)
+            if info.is_dir() or not accepts(name):
+                continue
+            with archive.open(info) as f:
+                yield name, f, info.file_size
+
+
+def iter_members(path: str, accepts: Callable[[str], bool]) -> Iterator[Tuple[str, BinaryIO, int]]:
+    """Yields ``(name, file, size)`` for the regular files in an archive whose names are accepted
+
+    Each file can only be read until the next member is asked for, nothing is written to disk and only
+    what is read of the current member is held in memory
+    """
+    if path.lower().endswith(".zip"):
+        return _iter_zip(path, accepts)
+    return _iter_tar(path, accepts)
+
+
+def archive_errors() -> Tuple[type, ...]:
+    """Returns the exceptions raised when reading a broken archive"""
+    import tarfile
+    import zipfile
+    import zlib
+
+    errors = (OSError, EOFError, tarfile.TarError, zipfile.BadZipFile, zlib.error)
+    try:
+        import lzma
+    except ImportError:
+        return errors
+    return errors + (lzma.LZMAError,)
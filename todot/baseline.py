@@ -0,0 +1,77 @@
+"""Compares todos with the todos of an earlier run to find the ones that were added or removed"""
+import json
+import os
+import subprocess
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
+from .todo import Todo, iter_fingerprints
+
+__all__ = ("changed_files", "diff", "file_key", "load_baseline")
+
+# Todos paired with their fingerprints
+Fingerprinted = List[Tuple[Todo, str]]
+
+
+def file_key(path: str) -> str:
+    """Returns the name a file's todos are reported under, the same way as ``Todo.to_dict``"""
+    return path.lstrip(".\\/").replace("\\", "/")
+
+
+def load_baseline(path: str) -> Dict[str, Todo]:
+    """Reads the todos of an earlier run, keyed by their fingerprints
+
+    The file can be the output of ``--format ndjson`` or a JSON list of todos, as printed by ``todot query``,
+    todos without a fingerprint get one the same way as when they were printed
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    stripped = text.lstrip()
+    if stripped.startswith("[") or stripped.startswith('{"todos"'):
+        data = json.loads(text)
+        records = data["todos"] if isinstance(data, dict) else data
+    else:
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+    todos = [Todo.from_dict(record) for record in records]
+    fingerprints = [record.get("fingerprint") for record in records]
+    if None in fingerprints:
+        fingerprints = [i for _, i in iter_fingerprints(todos)]
+    return dict(zip(fingerprints, todos))
+
+
+def diff(
+    current: Iterable[Tuple[Todo, str]], baseline: Dict[str, Todo], files: Optional[Collection[str]] = None
+) -> Tuple[Fingerprinted, Fingerprinted]:
+    """Returns the todos that were added since the baseline and the ones that were removed from it
+
+    ``files`` limits the comparison to the baseline todos of those files, named as by file_key, for when only
+    the files that changed were parsed
+    """
+    seen = set()
+    added = []
+    for todo, fingerprint in current:
+        seen.add(fingerprint)
+        if fingerprint not in baseline:
+            added.append((todo, fingerprint))
+    removed = [
+        (todo, fingerprint) for fingerprint, todo in baseline.items()
+        if fingerprint not in seen and (files is None or file_key(todo.file_name) in files)
+    ]
+    return added, removed
+
+
+def changed_files(root: str, ref: str) -> List[str]:
+    """Returns the files inside a directory that changed since a git ref, including deleted and untracked ones
+
+    Raises OSError if git fails, such as when the directory isn't in a git repository or the ref doesn't exist
+    """
+    commands = (
+        ["git", "-C", root, "diff", "--name-only", "--no-renames", "--relative", "-z", ref, "--"],
+        ["git", "-C", root, "ls-files", "--others", "--exclude-standard", "-z"],
+    )
+    files = []
+    for command in commands:
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if process.returncode != 0:
+            raise OSError(process.stderr.decode("utf-8", "replace").strip() or f"{command[3]} failed")
+        files.extend(os.path.join(root, os.fsdecode(i)) for i in process.stdout.split(b"\0") if i)
+    return files
@@ -0,0 +1,157 @@
+"""Finds who wrote every todo and when using git blame"""
+import hashlib
+import os
+import subprocess
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .cache import ParseCache
+from .todo import BlamedTodo, Todo
+
+__all__ = ("Blamer", "parse_porcelain")
+
+# The commit git blame shows for lines that haven't been committed yet
+UNCOMMITTED = "0" * 40
+# A line's (commit, author, date)
+Blame = Tuple[str, Optional[str], Optional[str]]
+
+
+def _line_ranges(lines: List[int]) -> List[Tuple[int, int]]:
+    """Merges sorted line numbers into ``(start, end)`` ranges of consecutive lines"""
+    ranges = []
+    for line in lines:
+        if ranges and ranges[-1][1] == line - 1:
+            ranges[-1] = (ranges[-1][0], line)
+        else:
+            ranges.append((line, line))
+    return ranges
+
+
+def _format_date(seconds: bytes, tz: bytes) -> Optional[str]:
+    """Converts a git timestamp and timezone such as ``+0200`` to an ISO 8601 timestamp"""
+    try:
+        sign = -1 if tz.startswith(b"-") else 1
+        offset = timedelta(hours=int(tz[1:3]), minutes=int(tz[3:5])) * sign
+        return datetime.fromtimestamp(int(seconds), timezone(offset)).isoformat()
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+def parse_porcelain(output: bytes) -> Dict[int, Blame]:
+    """Returns the ``(commit, author, date)`` of every line in the output of ``git blame --porcelain``
+
+    Every line starts with a header of its commit and line numbers, followed by the details of the commit
+    the first time it appears and then the line itself, which starts with a tab
+    """
+    commits: Dict[str, Dict[bytes, bytes]] = {}
+    lines: Dict[int, str] = {}
+    commit = None
+    for line in output.split(b"\n"):
+        if line.startswith(b"\t"):
+            commit = None
+        elif commit is None:
+            parts = line.split(b" ")
+            if len(parts) < 3:
+                continue
+            commit = parts[0].decode("ascii", "replace")
+            lines[int(parts[2])] = commit
+            commits.setdefault(commit, {})
+        else:
+            key, _, value = line.partition(b" ")
+            commits[commit][key] = value
+    blamed = {}
+    for linepos, commit in lines.items():
+        details = commits[commit]
+        if commit == UNCOMMITTED:
+            blamed[linepos] = (commit, None, None)
+            continue
+        author = details.get(b"author")
+        date = _format_date(details.get(b"author-time", b""), details.get(b"author-tz", b"+0000"))
+        blamed[linepos] = (commit, author.decode("utf-8", "replace") if author is not None else None, date)
+    return blamed
+
+
+def _blob_hash(file: str) -> Optional[str]:
+    """Hashes a file's contents the same way as git hashes blobs"""
+    try:
+        with open(file, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class Blamer:
+    """Adds who wrote the line of every todo and when, running at most one git blame per file
+
+    Files are blamed by a pool of ``workers`` threads, only for the lines with todos, and with a cache the
+    committed lines are stored by the hash of the file's contents so unchanged files are never blamed again
+    """
+
+    def __init__(self, *, workers=None, cache: ParseCache = None):
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.cache = cache
+
+    @staticmethod
+    def _run_blame(file: str, lines: List[int]) -> Dict[int, Blame]:
+        command = ["git", "blame", "--porcelain"]
+        for start, end in _line_ranges(lines):
+            command.extend(("-L", f"{start},{end}"))
+        command.extend(("--", os.path.basename(file)))
+        try:
+            process = subprocess.run(
+                command, cwd=os.path.dirname(file) or ".", stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+        except OSError:
+            return {}
+        # Files outside a repository or that aren't tracked can't be blamed
+        if process.returncode != 0:
+            return {}
+        return parse_porcelain(process.stdout)
+
+    def blame_file(self, file: str, todos: List[Todo]) -> List[BlamedTodo]:
+        """Adds the author and the date to the todos of a file"""
+        if not os.path.isfile(file):
+            # Such as files inside archives
+            return [BlamedTodo.from_todo(todo, None, None) for todo in todos]
+        lines = sorted({todo.linepos for todo in todos})
+        blamed: Dict[int, Tuple[Optional[str], Optional[str]]] = {}
+        blob = _blob_hash(file) if self.cache is not None else None
+        if blob is not None:
+            blamed.update(self.cache.get_blame(blob, lines))
+        missing = [i for i in lines if i not in blamed]
+        if missing:
+            found = self._run_blame(file, missing)
+            # Uncommitted lines will have an author once they are committed, so they aren't cached
+            committed = {
+                line: (author, date) for line, (commit, author, date) in found.items() if commit != UNCOMMITTED
+            }
+            if blob is not None:
+                self.cache.put_blame(blob, committed)
+            blamed.update(committed)
+        return [BlamedTodo.from_todo(todo, *blamed.get(todo.linepos, (None, None))) for todo in todos]
+
+    def _blame_pair(self, file: str, todos: List[Todo]) -> Tuple[str, List[BlamedTodo]]:
+        return file, self.blame_file(file, todos)
+
+    def iter_blame(self, files: Iterable[Tuple[str, List[Todo]]]) -> Iterator[Tuple[str, List[BlamedTodo]]]:
+        """Yields every file with its todos blamed, in the same order as ``files``
+
+        Only a few files more than there are workers are blamed ahead of the one being yielded, so the
+        todos keep streaming
+        """
+        pending = deque()
+        with ThreadPoolExecutor(self.workers) as pool:
+            for file, todos in files:
+                if todos:
+                    future = pool.submit(self._blame_pair, file, todos)
+                else:
+                    future = Future()
+                    future.set_result((file, []))
+                pending.append(future)
+                if len(pending) > self.workers * 4:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
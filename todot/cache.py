@@ -0,0 +1,199 @@
+"""Caches parsed todos on disk between runs"""
+import os
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+__all__ = ("ParseCache",)
+
+# Bump this whenever the records or the way they are parsed change
+CACHE_VERSION = 2
+# Files modified this recently may still be written to within the same mtime tick, so they are not cached
+RACY_SECONDS = 2
+
+
+class ParseCache:
+    """An on-disk cache of parsed todo records keyed on each file's path, size and modification time
+
+    Entries are stored in a sqlite database so several todot processes can share the cache safely,
+    and the least recently used entries are evicted once the cache grows past ``max_size`` bytes
+    """
+
+    def __init__(self, directory=".todot-cache", *, max_size=64 * 1024 * 1024, checksum=False, rebuild=False):
+        self.directory = directory
+        self.max_size = max_size
+        self.checksum = checksum
+        self._lock = threading.Lock()
+        self._used = []
+        self._pending = 0
+        self._db = None
+        # Imported here since they are slow to import and not needed when the cache is turned off
+        try:
+            import sqlite3
+        except ImportError:
+            return
+        import json
+
+        self._sqlite3 = sqlite3
+        self._json = json
+        try:
+            os.makedirs(directory, exist_ok=True)
+            ignore_file = os.path.join(directory, ".gitignore")
+            if not os.path.exists(ignore_file):
+                with open(ignore_file, "w", encoding="utf-8") as f:
+                    f.write("# Created by todot, this directory can be safely deleted\n*\n")
+            self._db = sqlite3.connect(os.path.join(directory, "parse.sqlite3"), timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "namespace TEXT, path TEXT, size INTEGER, mtime INTEGER, digest TEXT, records TEXT, used REAL, "
+                "PRIMARY KEY (namespace, path))"
+            )
+            # Lines are blamed by the hash of the file's contents, so they stay valid wherever the file is
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS blame (blob TEXT, line INTEGER, author TEXT, date TEXT, "
+                "PRIMARY KEY (blob, line))"
+            )
+            if rebuild:
+                self._db.execute("DELETE FROM entries")
+                self._db.execute("DELETE FROM blame")
+            self._db.commit()
+        except (OSError, sqlite3.Error) as exc:
+            print(f"Failed to open the cache due to {exc}", file=sys.stderr)
+            self._db = None
+
+    @staticmethod
+    def namespace(*parts) -> str:
+        """Makes a namespace for entries out of everything that affects how files are parsed"""
+        import hashlib
+
+        return hashlib.sha1(repr((CACHE_VERSION,) + parts).encode("utf-8")).hexdigest()
+
+    def key(self, file: str) -> Optional[Tuple[int, int, str]]:
+        """Returns the ``(size, mtime, digest)`` a file is cached under, or None if it can't be cached"""
+        try:
+            stat = os.stat(file)
+            digest = ""
+            if self.checksum:
+                import hashlib
+
+                with open(file, "rb") as f:
+                    digest = hashlib.sha1(f.read()).hexdigest()
+        except OSError:
+            return None
+        # Compared with the current time since a cache can be used for much longer than one run
+        if stat.st_mtime > time.time() - RACY_SECONDS:
+            return None
+        return stat.st_size, stat.st_mtime_ns, digest
+
+    def get(self, namespace: str, file: str, key) -> Optional[Tuple[List[tuple], Optional[str]]]:
+        """Returns the cached records of a file and how reading it went, or None if it changed since it was cached"""
+        if self._db is None or key is None:
+            return None
+        with self._lock:
+            try:
+                row = self._db.execute(
+                    "SELECT size, mtime, digest, records FROM entries WHERE namespace = ? AND path = ?",
+                    (namespace, file),
+                ).fetchone()
+            except self._sqlite3.Error:
+                return None
+            if row is None or tuple(row[:3]) != key:
+                return None
+            self._used.append((namespace, file))
+        entry = self._json.loads(row[3])
+        return [tuple(record) for record in entry["records"]], entry["status"]
+
+    def put(self, namespace: str, file: str, key, records: List[tuple], status: Optional[str] = None):
+        """Stores the records of a file and how reading it went, such as ``"replaced"``"""
+        if self._db is None or key is None:
+            return
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (namespace, file, *key, self._json.dumps({"records": records, "status": status}), time.time()),
+                )
+            except self._sqlite3.Error:
+                return
+            self._pending += 1
+        if self._pending >= 1000:
+            self.flush()
+
+    def get_blame(self, blob: str, lines: Iterable[int]) -> Dict[int, Tuple[str, str]]:
+        """Returns the ``(author, date)`` of the lines of a file's contents that were blamed before"""
+        if self._db is None:
+            return {}
+        lines = list(lines)
+        rows = []
+        with self._lock:
+            try:
+                # Old versions of sqlite allow at most 999 parameters in a query
+                for start in range(0, len(lines), 500):
+                    batch = lines[start:start + 500]
+                    placeholders = ", ".join("?" * len(batch))
+                    rows.extend(self._db.execute(
+                        f"SELECT line, author, date FROM blame WHERE blob = ? AND line IN ({placeholders})",
+                        (blob, *batch),
+                    ))
+            except self._sqlite3.Error:
+                return {}
+        return {line: (author, date) for line, author, date in rows}
+
+    def put_blame(self, blob: str, blamed: Dict[int, Tuple[str, str]]):
+        """Stores the ``(author, date)`` of lines of a file's contents"""
+        if self._db is None or not blamed:
+            return
+        with self._lock:
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO blame VALUES (?, ?, ?, ?)",
+                    [(blob, line, author, date) for line, (author, date) in blamed.items()],
+                )
+            except self._sqlite3.Error:
+                return
+            self._pending += len(blamed)
+        if self._pending >= 1000:
+            self.flush()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(LENGTH(records)), 0) FROM entries").fetchone()[0]
+        if total <= self.max_size:
+            return
+        # Free a quarter more than needed so that eviction doesn't run on every flush
+        to_free = total - self.max_size * 3 // 4
+        evicted = []
+        for rowid, size in self._db.execute("SELECT rowid, LENGTH(records) FROM entries ORDER BY used"):
+            if to_free <= 0:
+                break
+            evicted.append((rowid,))
+            to_free -= size
+        self._db.executemany("DELETE FROM entries WHERE rowid = ?", evicted)
+
+    def flush(self):
+        """Writes pending changes to disk and evicts old entries if the cache is too big"""
+        if self._db is None:
+            return
+        with self._lock:
+            try:
+                now = time.time()
+                self._db.executemany(
+                    "UPDATE entries SET used = ? WHERE namespace = ? AND path = ?",
+                    [(now, namespace, file) for namespace, file in self._used],
+                )
+                self._evict()
+                self._db.commit()
+            except self._sqlite3.Error as exc:
+                print(f"Failed to update the cache due to {exc}", file=sys.stderr)
+                self._db.rollback()
+            self._used.clear()
+            self._pending = 0
+
+    def close(self):
+        """Flushes and closes the cache"""
+        if self._db is None:
+            return
+        self.flush()
+        self._db.close()
+        self._db = None
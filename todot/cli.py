@@ -1,4 +1,5 @@
 import argparse
+import os
 import re
 
 from . import __version__
@@ -13,15 +14,34 @@ def github_repo_branch(arg_value):
     if not re.match(r'\w{0,28}',arg_value):
         raise argparse.ArgumentTypeError('Invalid github repository url')
     return arg_value
+def file_size(arg_value):
+    match = re.fullmatch(r'\s*(\d+)\s*([kmg]?)b?\s*', str(arg_value), re.IGNORECASE)
+    if not match:
+        raise argparse.ArgumentTypeError('Invalid file size, expected a number of bytes such as 500000, 512K or 10M')
+    return int(match.group(1)) * 1024 ** " kmg".index(match.group(2).lower() or " ")
 
 argparser = argparse.ArgumentParser(
     prog="todot",
-    usage="%(prog)s path [options] ",
+    usage="%(prog)s [path ...] [options] ",
     description="A powerful tool to parse TODOs/FIXMEs etc. from source files",
     epilog="Enjoy the program! :)",
 )
 
-argparser.add_argument("path", metavar="path", type=str, nargs="?", help="specify a path to list todos from")
+argparser.add_argument(
+    "path",
+    metavar="path",
+    type=str,
+    nargs="*",
+    help="specify the paths to list todos from, including tar and zip archives",
+)
+argparser.add_argument(
+    "--roots-file",
+    metavar="file",
+    type=str,
+    required=False,
+    default=None,
+    help="specify a file listing more paths to list todos from, one per line, - for stdin",
+)
 argparser.add_argument("--version", action="store_true")
 argparser.add_argument(
     "--output",
@@ -56,6 +76,27 @@ argparser.add_argument(
     action="store_true",
     help="if used, ignores files in .gitignore",
 )
+argparser.add_argument(
+    "--git-files",
+    action="store_true",
+    default=None,
+    help="if used, lists files from the git index instead of walking the directories, "
+    "by default used when the path has a .git directory",
+)
+argparser.add_argument(
+    "--no-git-files",
+    action="store_false",
+    dest="git_files",
+    help="if used, always walks the directories even inside a git repository",
+)
+argparser.add_argument(
+    "--walk-threads",
+    metavar="N",
+    type=int,
+    required=False,
+    default=None,
+    help="number of threads to list directories with, useful on network filesystems, by default 1",
+)
 argparser.add_argument(
     "--tags",
     metavar="tag1,tag2...",
@@ -64,6 +105,139 @@ argparser.add_argument(
     default=None,
     help="comma delimited list input of extra tags to parse",
 )
+argparser.add_argument(
+    "--jobs",
+    "-j",
+    metavar="N",
+    type=int,
+    required=False,
+    default=None,
+    help="number of processes to parse files with, 0 for one per cpu, by default 1",
+)
+argparser.add_argument(
+    "--no-cache",
+    action="store_true",
+    help="if used, parses every file again instead of reusing todos from the last run",
+)
+argparser.add_argument(
+    "--rebuild-cache",
+    action="store_true",
+    help="if used, throws away the cache and parses every file again",
+)
+argparser.add_argument(
+    "--cache-dir",
+    metavar="directory",
+    type=str,
+    required=False,
+    default=None,
+    help="specify a directory to store the cache in, by default .todot-cache",
+)
+argparser.add_argument(
+    "--max-file-size",
+    metavar="size",
+    type=str,
+    required=False,
+    default=None,
+    help="size above which files are skipped or streamed, such as 512K or 10M, by default there is no limit",
+)
+argparser.add_argument(
+    "--oversized",
+    metavar="action",
+    type=str,
+    choices=["skip", "stream"],
+    required=False,
+    default=None,
+    help="what to do with files over --max-file-size, skip or stream them, by default stream",
+)
+argparser.add_argument(
+    "--watch",
+    action="store_true",
+    help="if used, keeps running and prints the todos again whenever a file changes",
+)
+argparser.add_argument(
+    "--watch-delta",
+    action="store_true",
+    help="if used with --watch, only prints the todos that were added or removed",
+)
+argparser.add_argument(
+    "--watch-polling",
+    action="store_true",
+    help="if used with --watch, checks for changes periodically instead of using inotify",
+)
+argparser.add_argument(
+    "--watch-interval",
+    metavar="seconds",
+    type=float,
+    required=False,
+    default=None,
+    help="how often to check for changes when polling, by default 1 second",
+)
+argparser.add_argument(
+    "--stats",
+    action="store_true",
+    help="if used, prints how long every phase took, counters and the slowest files on stderr",
+)
+argparser.add_argument(
+    "--stats-json",
+    metavar="file",
+    type=str,
+    required=False,
+    default=None,
+    help="specify a file to save the stats to as JSON",
+)
+argparser.add_argument(
+    "--stats-top",
+    metavar="count",
+    type=int,
+    required=False,
+    default=None,
+    help="how many of the slowest files to list in the stats, by default 10",
+)
+argparser.add_argument(
+    "--profile",
+    metavar="file",
+    type=str,
+    required=False,
+    default=None,
+    help="specify a file to save a cProfile profile of the run to",
+)
+argparser.add_argument(
+    "--baseline",
+    metavar="file",
+    type=str,
+    required=False,
+    default=None,
+    help="specify the ndjson output of an earlier run to only print the todos added or removed since then",
+)
+argparser.add_argument(
+    "--changed-since",
+    metavar="ref",
+    type=str,
+    required=False,
+    default=None,
+    help="if used, only parses the files that changed since a git commit, branch or tag",
+)
+argparser.add_argument(
+    "--rev",
+    metavar="ref",
+    action="append",
+    required=False,
+    default=None,
+    help="specify a git commit, branch or tag to read the files of instead of the working tree, can be repeated",
+)
+argparser.add_argument(
+    "--blame",
+    action="store_true",
+    help="if used, adds who last changed the line of every todo and when using git blame",
+)
+argparser.add_argument(
+    "--blame-jobs",
+    metavar="N",
+    type=int,
+    required=False,
+    default=None,
+    help="number of files to run git blame on at once, by default the number of cpus up to 8",
+)
 argparser.add_argument(
     "--repo",
     action="store",
@@ -83,3 +257,142 @@ argparser.add_argument(
     help="specify a github repository branch to add hyperlinks to, by default master",
 )
 
+
+def to_bool(value) -> bool:
+    """Converts a flag that may have been read from the config file as a string"""
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def apply_config(args):
+    """Fills in the options that weren't given on the command line from --configfile or .todotrc"""
+    config_file = args.configfile or (".todotrc" if os.path.exists(".todotrc") else None)
+    if not config_file:
+        return
+    # Only imported when there is a config file since most runs don't have one
+    import configparser
+
+    config = configparser.ConfigParser()
+    config.read(config_file)
+    if not config.has_section("TODOT"):
+        return
+    for key, value in config["TODOT"].items():
+        provided_value = getattr(args, key, None)
+        if (not provided_value) or provided_value == "default":
+            setattr(args, key, value)
+
+
+def read_roots(file: str) -> list:
+    """Reads the paths listed in a roots file, paths are relative to the directory of the file
+
+    Empty lines and lines starting with # are left out
+    """
+    import sys
+
+    if file == "-":
+        lines, directory = sys.stdin.read().splitlines(), ""
+    else:
+        with open(file, encoding="utf-8") as f:
+            lines, directory = f.read().splitlines(), os.path.dirname(file)
+    return [os.path.join(directory, i.strip()) for i in lines if i.strip() and not i.strip().startswith("#")]
+
+
+def add_scan_arguments(parser: argparse.ArgumentParser):
+    """Adds the options that pick which files and todos are found to the argument parser of a subcommand"""
+    parser.add_argument("--configfile", default=None, help="file to read the config from")
+    parser.add_argument(
+        "--ignore",
+        "--exclude",
+        metavar="file1,file2...",
+        type=str,
+        default=None,
+        help="comma delimited list input of files to ignore",
+    )
+    parser.add_argument("--gitignore", action="store_true", help="if used, ignores files in .gitignore")
+    parser.add_argument(
+        "--tags",
+        metavar="tag1,tag2...",
+        type=str,
+        default=None,
+        help="comma delimited list input of extra tags to parse",
+    )
+
+
+def create_serve_argparser() -> argparse.ArgumentParser:
+    """Creates the argument parser of todot serve, only when it is used"""
+    serve_argparser = argparse.ArgumentParser(
+        prog="todot serve",
+        usage="%(prog)s [path ...] [options]",
+        description="Keeps the todos of one or more paths in memory and answers queries from other tools",
+    )
+    serve_argparser.add_argument(
+        "paths", metavar="path", type=str, nargs="*", help="specify the paths to serve todos from"
+    )
+    serve_argparser.add_argument(
+        "--socket",
+        metavar="file",
+        type=str,
+        default=None,
+        help="specify a unix socket to listen on, by default one in the temporary directory for the current directory",
+    )
+    serve_argparser.add_argument(
+        "--port",
+        metavar="port",
+        type=int,
+        default=None,
+        help="if used, listens for http requests on this port of localhost instead of a unix socket",
+    )
+    add_scan_arguments(serve_argparser)
+    serve_argparser.add_argument(
+        "--watch-polling",
+        action="store_true",
+        help="if used, checks for changes periodically instead of using inotify",
+    )
+    serve_argparser.add_argument(
+        "--watch-interval",
+        metavar="seconds",
+        type=float,
+        default=1.0,
+        help="how often to check for changes when polling, by default 1 second",
+    )
+    return serve_argparser
+
+
+def create_query_argparser() -> argparse.ArgumentParser:
+    """Creates the argument parser of todot query, only when it is used"""
+    query_argparser = argparse.ArgumentParser(
+        prog="todot query",
+        usage="%(prog)s [options]",
+        description="Prints todos as JSON from a running todot server, or by searching directly if none is running",
+    )
+    query_argparser.add_argument("--tag", metavar="tag", type=str, default=None, help="only prints todos with this tag")
+    query_argparser.add_argument(
+        "--associate",
+        metavar="name",
+        type=str,
+        default=None,
+        help="only prints todos assigned to this person",
+    )
+    query_argparser.add_argument(
+        "--path",
+        metavar="prefix",
+        type=str,
+        default=None,
+        help="only prints todos in files starting with this path",
+    )
+    query_argparser.add_argument(
+        "--root",
+        metavar="path",
+        type=str,
+        default=None,
+        help="only prints todos from this served path, also the path searched when no server is running",
+    )
+    query_argparser.add_argument(
+        "--socket", metavar="file", type=str, default=None, help="specify the server's unix socket"
+    )
+    query_argparser.add_argument(
+        "--port", metavar="port", type=int, default=None, help="specify the server's http port"
+    )
+    add_scan_arguments(query_argparser)
+    return query_argparser
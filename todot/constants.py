@@ -26,3 +26,34 @@ VALID_FILE_TYPES = {
     "TypeScript": ["ts"],
     "XML": ["xml"],
 }
+
+# The tokens a comment can start with in any language, used for files of unknown languages
+GENERIC_COMMENT_TOKENS = ("//", "#", "<--", "<!--", "/*", ";", "--")
+
+# A dict of the languages in VALID_FILE_TYPES to the tokens their comments start with, languages that embed
+# other languages, such as scripts and styles inside HTML or HTML inside PHP, also have their comment tokens
+COMMENT_TOKENS = {
+    "Assembly": (";", "#", "//", "/*"),
+    "C": ("//", "/*"),
+    "C++": ("//", "/*"),
+    "CSS": ("/*",),
+    "Dart": ("//", "/*"),
+    "Go": ("//", "/*"),
+    "Haskell": ("--", "{-"),
+    "HTML": ("<!--", "//", "/*"),
+    "Java": ("//", "/*"),
+    "JavaScript": ("//", "/*"),
+    "Kotlin": ("//", "/*"),
+    "Markdown": ("<!--",),
+    "Perl": ("#",),
+    "PHP": ("//", "#", "/*", "<!--"),
+    "Python": ("#",),
+    "R": ("#",),
+    "Ruby": ("#",),
+    "Rust": ("//", "/*"),
+    "Scala": ("//", "/*"),
+    "SQL": ("--", "/*"),
+    "Swift": ("//", "/*"),
+    "TypeScript": ("//", "/*"),
+    "XML": ("<!--",),
+}
@@ -1,60 +1,329 @@
 """Finds source files"""
 import os
 import re
+import stat
+import threading
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Union
-
-import pathspec
+from typing import Iterator, List, Optional, Pattern, Tuple, Union
 
 from .constants import VALID_FILE_TYPES
+from .ignore import ExcludeMatcher, GitIgnoreMatcher, Levels
+from .stats import Stats
+
+__all__ = ("Finder", "Visited")
+
+# A (path, relative_path, is_dir, (st_dev, st_ino)) entry of a directory listing
+Entry = Tuple[str, str, bool, Tuple[int, int]]
+
+
+class Visited:
+    """The ``(st_dev, st_ino)`` of every file and directory found so far
+
+    Everything found in one search shares one of these, so that a physical file is found once even when
+    it can be reached through symlinks, hard links or bind mounts, and symlink loops come to an end
+    """
+
+    def __init__(self):
+        self.keys = set()
+        self._lock = threading.Lock()
+
+    def add(self, key: Tuple[int, int]) -> bool:
+        """Adds a file or directory, returning False if it was found before"""
+        with self._lock:
+            if key in self.keys:
+                return False
+            self.keys.add(key)
+            return True
+
+
+@lru_cache(maxsize=64)
+def _compile_file_types(filetypes: Tuple[str, ...]) -> Pattern:
+    """Compiles the regex that matches the names of source files"""
+    return re.compile(rf".*\.({'|'.join(filetypes)})$")
+
+
+@lru_cache(maxsize=64)
+def _exclude_matcher(exclude: Tuple[str, ...]) -> ExcludeMatcher:
+    """Creates the matcher for a list of excluded paths, matchers don't change so finders can share them"""
+    return ExcludeMatcher(exclude)
+
 
-__all__ = ("Finder",)
+class _Deferred:
+    """Stands in for a future when walking without threads, the function runs when the result is needed"""
+
+    def __init__(self, function, *args):
+        self.function = function
+        self.args = args
+
+    def result(self):
+        """Runs the function and returns its result"""
+        return self.function(*self.args)
 
 
 class Finder:
     """A class for finding source files"""
 
-    def __init__(self, path=None, *, filetypes=None, exclude=None, gitignore=None):
+    def __init__(
+        self,
+        path=None,
+        *,
+        filetypes=None,
+        exclude=None,
+        gitignore=None,
+        git_files=None,
+        walk_threads=None,
+        stats: Stats = None,
+    ):
         self.filetypes = filetypes or [
             item.replace("+", r"\+") for sublist in VALID_FILE_TYPES.values() for item in sublist
         ]
         self.path = Path(path or ".")
-        self.exclude = exclude or []
+        self.exclude = list(exclude or [])
         self.exclude.extend(("TODO.md", "todo.txt"))
+        self.excluder = _exclude_matcher(tuple(self.exclude))
         self.gitignore = gitignore or False
-        self.valid_file_types = re.compile(rf".*\.({'|'.join(self.filetypes)})$")
+        self.ignore = GitIgnoreMatcher() if self.gitignore else None
+        # None means the git index is used whenever the path is the root of a git repository
+        self.git_files = git_files
+        self.git_failed = False
+        self.used_git = False
+        # The number of threads listing directories at once, mostly useful on network filesystems
+        self.walk_threads = walk_threads or 1
+        self.stats = stats
+        self.valid_file_types = _compile_file_types(tuple(self.filetypes))
 
-    def _find(self, path: Path) -> Union[List[str], None]:
-        files_grabbed = []
+    def _list(self, path: str, relative: str, ignore_levels: Levels) -> Tuple[List[Entry], Levels]:
+        """Lists the source files and the subdirectories to search inside a directory
+
+        Returns ``(path, relative_path, is_dir, key)`` entries and the ignore levels for the subdirectories
+        """
         try:
             files = list(os.scandir(path))
+            device = os.stat(path).st_dev
         except (OSError, NotADirectoryError, PermissionError) as exc:
             print(f"Failed to find files due to {exc}")
-            return
-        if self.gitignore:
-            try:
-                with open(".gitignore") as f:
-                    gitignore = f.read().splitlines()
-            except (OSError, PermissionError, FileNotFoundError) as exc:
-                print(f"Failed to read gitignore due to {exc}")
-                return
-            else:
-                formatted_files = [i.path.replace("\\", "/").replace("./","") for i in files]
-                spec = pathspec.PathSpec.from_lines(pathspec.patterns.GitWildMatchPattern, gitignore)
-                ignore_files = list(spec.match_files(formatted_files))
-                self.exclude.extend(ignore_files)
+            return [], ignore_levels
+        if self.ignore is not None:
+            ignore_levels = self.ignore.enter(ignore_levels, path, relative)
+        if self.stats is None:
+            return self._filter(files, relative, ignore_levels, device), ignore_levels
+        self.stats.count("directories")
+        self.stats.count("considered", len(files))
+        with self.stats.phase("ignore"):
+            entries = self._filter(files, relative, ignore_levels, device)
+        self.stats.count("ignored", len(files) - len(entries))
+        return entries, ignore_levels
+
+    def _filter(
+        self, files: List[os.DirEntry], relative: str, ignore_levels: Levels, device: int
+    ) -> List[Entry]:
+        """Leaves out the hidden, excluded, ignored and non source files and directories of a listing
+
+        ``device`` is the ``st_dev`` of the directory, which every file in it that isn't a symlink shares
+        """
+        entries = []
         for file in files:
             if any(i.startswith(".") for i in file.name.replace("\\", "/").split("/")):
                 continue
-            if file.path.replace("\\", "/").lstrip("/.") in self.exclude:
+            file_relative = f"{relative}/{file.name}" if relative else file.name
+            is_dir = file.is_dir()
+            # Excluded directories are skipped here so that they are never listed
+            if self.excluder.is_excluded(file_relative, file.path.replace("\\", "/").lstrip("/."), is_dir=is_dir):
+                continue
+            if ignore_levels and self.ignore.is_ignored(ignore_levels, file_relative, is_dir):
                 continue
-            if file.is_dir():
-                files_grabbed.extend(self._find(file.path))
-            if not self.valid_file_types.match(file.name):
+            if not is_dir and not self.valid_file_types.match(file.name):
                 continue
-            files_grabbed.append(file.path)
-        return files_grabbed
+            # Directories are stat'ed since they may be mount points, the inode of other files is free
+            if is_dir or file.is_symlink():
+                try:
+                    file_stat = file.stat()
+                except OSError:
+                    continue
+                key = (file_stat.st_dev, file_stat.st_ino)
+            else:
+                key = (device, file.inode())
+            entries.append((file.path, file_relative, is_dir, key))
+        return entries
+
+    def _expand(self, submit, listing) -> Iterator[Tuple[str, Tuple[int, int], Optional[object]]]:
+        """Pairs every entry of a finished listing with its key and the submitted listing of the subdirectory"""
+        entries, ignore_levels = listing.result()
+        return iter([
+            (path, key, submit(self._list, path, relative, ignore_levels) if is_dir else None)
+            for path, relative, is_dir, key in entries
+        ])
+
+    def _enter_root(self, visited: Visited) -> bool:
+        """Marks the search path as found, returning False if it was already found by another search"""
+        try:
+            root_stat = os.stat(str(self.path))
+        except OSError:
+            # Reported when the path is listed
+            return True
+        return visited.add((root_stat.st_dev, root_stat.st_ino))
+
+    def _parent_levels(self) -> Levels:
+        """Returns the ignore levels of the .gitignore files above the search path"""
+        return self.ignore.enter_parents(str(self.path)) if self.ignore is not None else ()
+
+    def _walk(self, submit, visited: Visited) -> Iterator[str]:
+        """Walks the directories depth first using an explicit stack instead of recursion
+
+        Every subdirectory is handed to ``submit`` as soon as its parent is listed, so that with a thread
+        pool siblings are listed in the background while the files are still yielded in the same order
+        as a serial walk. Files and directories that were already found are left out here rather than by
+        the threads, so that they are always found under the same path as in a serial walk
+        """
+        if not self._enter_root(visited):
+            return
+        stack = [self._expand(submit, submit(self._list, str(self.path), "", self._parent_levels()))]
+        while stack:
+            path, key, listing = next(stack[-1], (None, None, None))
+            if path is None:
+                stack.pop()
+            elif not visited.add(key):
+                continue
+            elif listing is None:
+                yield path
+            else:
+                stack.append(self._expand(submit, listing))
+
+    def iter_directories(self) -> Iterator[str]:
+        """Yields every directory that is searched for files, starting with the path itself"""
+        visited = Visited()
+        self._enter_root(visited)
+        stack = [(str(self.path), "", self._parent_levels(), None)]
+        while stack:
+            path, relative, ignore_levels, key = stack.pop()
+            if key is not None and not visited.add(key):
+                continue
+            yield path
+            entries, ignore_levels = self._list(path, relative, ignore_levels)
+            stack.extend((i, j, ignore_levels, key) for i, j, is_dir, key in reversed(entries) if is_dir)
+
+    def accepts(self, path: str) -> bool:
+        """Checks whether a single path inside the search path would be found, without searching"""
+        relative = os.path.relpath(path, str(self.path)).replace("\\", "/")
+        parts = relative.split("/")
+        if relative.startswith("../") or any(i.startswith(".") for i in parts):
+            return False
+        if not self.valid_file_types.match(parts[-1]):
+            return False
+        if self.excluder.is_path_excluded(relative, path.replace("\\", "/").lstrip("/.")):
+            return False
+        ignore = self.ignore
+        if ignore is None and self.used_git:
+            # Git skips ignored files by itself, new files have to be checked here instead
+            ignore = self.ignore = GitIgnoreMatcher()
+        if ignore is None:
+            return True
+        levels = ignore.enter(ignore.enter_parents(str(self.path)), str(self.path), "")
+        for i in range(1, len(parts)):
+            directory = "/".join(parts[:i])
+            if ignore.is_ignored(levels, directory, is_dir=True):
+                return False
+            levels = ignore.enter(levels, os.path.join(str(self.path), *parts[:i]), directory)
+        return not ignore.is_ignored(levels, relative)
+
+    def accepts_member(self, name: str) -> bool:
+        """Checks whether a file inside an archive would be found if the archive was the search path"""
+        parts = name.split("/")
+        if any(i.startswith(".") for i in parts) or not self.valid_file_types.match(parts[-1]):
+            return False
+        return not self.excluder.is_path_excluded(name)
+
+    def _find(self, visited: Visited) -> Iterator[str]:
+        if self.walk_threads < 2:
+            yield from self._walk(_Deferred, visited)
+            return
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        pool = ThreadPoolExecutor(self.walk_threads)
+        pending = set()
+
+        def submit(function, *args):
+            future = pool.submit(function, *args)
+            pending.add(future)
+            future.add_done_callback(pending.discard)
+            return future
+
+        try:
+            yield from self._walk(submit, visited)
+        finally:
+            for future in list(pending):
+                future.cancel()
+            pool.shutdown()
+
+    def _find_git(self, visited: Visited) -> Iterator[str]:
+        """Yields the tracked and the untracked but not ignored files listed by git
+
+        Sets ``self.git_failed`` without yielding anything if git is not available or the path is not a
+        git repository
+        """
+        import subprocess
+
+        try:
+            process = subprocess.Popen(
+                ["git", "-C", str(self.path), "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError:
+            self.git_failed = True
+            return
+        listed = False
+        stats = self.stats
+        with process:
+            remainder = b""
+            for chunk in iter(lambda: process.stdout.read(65536), b""):
+                listed = True
+                *names, remainder = (remainder + chunk).split(b"\0")
+                kept = 0
+                for name in names:
+                    name = os.fsdecode(name)
+                    if any(i.startswith(".") for i in name.split("/")):
+                        continue
+                    if not self.valid_file_types.match(name):
+                        continue
+                    path = os.path.join(str(self.path), name)
+                    if self.excluder.is_path_excluded(name, path.replace("\\", "/").lstrip("/.")):
+                        continue
+                    try:
+                        file_stat = os.stat(path)
+                    except OSError:
+                        continue
+                    if not stat.S_ISREG(file_stat.st_mode) or not visited.add((file_stat.st_dev, file_stat.st_ino)):
+                        continue
+                    kept += 1
+                    yield path
+                if stats is not None:
+                    stats.count("considered", len(names))
+                    stats.count("ignored", len(names) - kept)
+        self.git_failed = not listed and process.returncode != 0
+
+    def iter_find(self, visited: Visited = None) -> Iterator[str]:
+        """Yields source files one by one as they are found
+
+        Searches that share ``visited`` never yield the same physical file twice
+        """
+        if visited is None:
+            visited = Visited()
+        git_files = self.git_files
+        if git_files is None:
+            git_files = (self.path / ".git").exists()
+        if git_files:
+            yield from self._find_git(visited)
+            self.used_git = not self.git_failed
+            if self.used_git:
+                return
+        yield from self._find(visited)
 
-    def find(self):
+    def find(self) -> Union[List[str], None]:
         """Does the actual finding"""
-        return self._find(self.path)
+        files = list(self.iter_find())
+        if not files and not self.path.is_dir():
+            return None
+        return files
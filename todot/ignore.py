@@ -0,0 +1,181 @@
+"""Matches paths against .gitignore files"""
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+__all__ = ("ExcludeMatcher", "GitIgnoreMatcher")
+
+# A compiled .gitignore file, as (regex, include) pairs in the order they appear in the file
+Rules = Tuple[Tuple[Pattern, bool], ...]
+# The rules of every .gitignore file from the root down to a directory, as (directory, rules) pairs, the
+# directories above the root are given as the path of the root inside them followed by a slash instead
+Levels = Tuple[Tuple[str, Rules], ...]
+
+
+def _compile(lines) -> Rules:
+    # Imported here since it is slow to import and most runs don't read any .gitignore files
+    import pathspec
+
+    if hasattr(pathspec, "GitIgnoreSpec"):
+        spec = pathspec.GitIgnoreSpec.from_lines(lines)
+    else:
+        spec = pathspec.PathSpec.from_lines(pathspec.patterns.GitWildMatchPattern, lines)
+    return tuple((pattern.regex, pattern.include) for pattern in spec.patterns if pattern.include is not None)
+
+
+def _translate_glob(pattern: str) -> str:
+    """Translates a glob pattern into a regex that matches the path and everything inside it
+
+    ``**`` matches across directories, ``*`` and ``?`` only within one and a trailing slash only matches
+    directories, patterns without any other slash match at any depth
+    """
+    dir_only = pattern.endswith("/")
+    pattern = pattern.strip("/")
+    regex = "" if "/" in pattern else "(?:.*/)?"
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+            continue
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[" and "]" in pattern[i + 1:]:
+            end = pattern.index("]", i + 1)
+            characters = pattern[i + 1:end]
+            regex += "[^" + characters[1:] + "]" if characters.startswith("!") else "[" + characters + "]"
+            i = end
+        else:
+            regex += re.escape(char)
+        i += 1
+    # Directories are matched with a trailing slash so that dir_only patterns never match files
+    return regex + ("/.*" if dir_only else "(?:/.*)?")
+
+
+class ExcludeMatcher:
+    """Matches paths against a list of excluded paths and glob patterns
+
+    Exact paths are looked up in a set and every glob pattern is merged into a single compiled regex,
+    a directory that matches excludes everything inside it
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.paths = set()
+        globs = []
+        for pattern in patterns:
+            pattern = pattern.strip().replace("\\", "/")
+            if not pattern:
+                continue
+            # Patterns ending with a slash only match directories, at any depth when they have no other slash
+            if pattern.endswith("/") or any(i in pattern for i in "*?["):
+                while pattern.startswith("./"):
+                    pattern = pattern[2:]
+                globs.append(_translate_glob(pattern.lstrip("/")))
+            else:
+                self.paths.add(pattern.lstrip("/.").rstrip("/"))
+        self.regex: Optional[Pattern] = re.compile("|".join(f"(?:{i})" for i in globs)) if globs else None
+
+    def is_excluded(self, relative: str, *aliases: str, is_dir: bool = False) -> bool:
+        """Checks whether a single file or directory is excluded
+
+        ``relative`` is the path relative to the root of the search, ``aliases`` are other names the
+        same path may have been excluded by, such as its path relative to the current directory
+        """
+        if relative in self.paths or any(i in self.paths for i in aliases):
+            return True
+        if self.regex is None:
+            return False
+        return self.regex.fullmatch(relative + "/" if is_dir else relative) is not None
+
+    def is_path_excluded(self, relative: str, *aliases: str) -> bool:
+        """Checks whether a file or any of the directories it is in is excluded"""
+        for path in (relative,) + aliases:
+            parts = path.split("/")
+            if any("/".join(parts[:i]) in self.paths for i in range(1, len(parts) + 1)):
+                return True
+        return self.regex is not None and self.regex.fullmatch(relative) is not None
+
+
+class GitIgnoreMatcher:
+    """Matches paths relative to a root against every .gitignore file between the root and the path
+
+    Each .gitignore file is read and compiled only once, deeper files take precedence over the ones
+    above them and later patterns take precedence over earlier ones the same way as in git
+    """
+
+    def __init__(self):
+        self._rules: Dict[str, Rules] = {}
+        # Every .gitignore file looked for, whether or not it exists
+        self.paths: List[str] = []
+
+    def _load(self, directory: str, relative: str) -> Rules:
+        rules = self._rules.get(relative)
+        if rules is None:
+            self.paths.append(os.path.join(directory, ".gitignore"))
+            try:
+                with open(os.path.join(directory, ".gitignore"), encoding="utf-8") as f:
+                    rules = _compile(f.read().splitlines())
+            except FileNotFoundError:
+                rules = ()
+            except (OSError, UnicodeDecodeError) as exc:
+                print(f"Failed to read gitignore due to {exc}")
+                rules = ()
+            self._rules[relative] = rules
+        return rules
+
+    def enter_parents(self, root: str) -> Levels:
+        """Returns the levels of the .gitignore files above a root, from the top of its git repository down
+
+        Outside of a git repository the .gitignore files from the current directory down to the root are used
+        """
+        root = os.path.abspath(root)
+        top = root
+        while not os.path.exists(os.path.join(top, ".git")):
+            parent = os.path.dirname(top)
+            if parent == top:
+                cwd = os.getcwd()
+                top = cwd if root.startswith(os.path.join(cwd, "")) else root
+                break
+            top = parent
+        if top == root:
+            return ()
+        parts = os.path.relpath(root, top).replace("\\", "/").split("/")
+        levels = ()
+        for i in range(len(parts)):
+            # Patterns in a directory above the root are matched against the path from that directory
+            levels = self.enter(levels, os.path.join(top, *parts[:i]), "/".join(parts[i:]) + "/")
+        return levels
+
+    def enter(self, levels: Levels, directory: str, relative: str) -> Levels:
+        """Returns the levels that apply inside a directory, given the levels of its parent
+
+        ``directory`` is the path used to open the directory's .gitignore and ``relative`` is its path
+        relative to the root, an empty string for the root itself
+        """
+        rules = self._load(directory, relative)
+        if not rules:
+            return levels
+        return levels + ((relative, rules),)
+
+    @staticmethod
+    def is_ignored(levels: Levels, relative: str, is_dir: bool = False) -> bool:
+        """Checks whether a path relative to the root is ignored by the given levels"""
+        ignored = False
+        for base, rules in levels:
+            if base.endswith("/"):
+                path = base + relative
+            else:
+                path = relative[len(base) + 1:] if base else relative
+            if is_dir:
+                path += "/"
+            for regex, include in rules:
+                if regex.match(path):
+                    ignored = include
+        return ignored
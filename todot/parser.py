@@ -1,38 +1,429 @@
 """Parses todos from source files"""
+import codecs
+import mmap
+import os
 import re
+import sys
+from collections import Counter
+from functools import lru_cache
+from itertools import chain, groupby, islice
+from typing import Callable, Iterable, Iterator, List, Optional, Pattern, Tuple
 
+from .archive import archive_errors, is_archive, iter_members, member_path
+from .cache import ParseCache
+from .constants import COMMENT_TOKENS, GENERIC_COMMENT_TOKENS, VALID_FILE_TYPES
+from .stats import Stats, clock
+from .store import TodoStore
 from .todo import Todo
 
+# Files at least this big are memory mapped instead of read into memory before the prefilter runs
+MMAP_THRESHOLD = 1024 * 1024
+# Line breaks that str.splitlines() knows about besides \n, files with these are scanned line by line
+_EXTRA_LINE_BREAKS = re.compile("[\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+
+# How much of the start of a file is checked for NUL bytes to tell whether it's a binary file
+SNIFF_SIZE = 8 * 1024
+# How much of a file over the size limit is read at a time when it's streamed
+STREAM_CHUNK_SIZE = 1024 * 1024
+# Byte order marks and the encodings they stand for, utf-32 comes first since its marks start like utf-16's
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# A dict of file extensions to the language of the files with that extension
+_LANGUAGES = {extension: language for language, extensions in VALID_FILE_TYPES.items() for extension in extensions}
+
+# The tags and read options used inside worker processes, set by _init_worker
+_worker_options = None
+
+
+def _parse_lines(regex: Pattern, text: str):
+    records = []
+    for linepos, line in enumerate(text.splitlines(), 1):
+        match = regex.search(line)
+        if not match:
+            continue
+        records.append((linepos, match.group("tag"), match.group("associates"), match.group("text")))
+    return records
+
+
+def _parse_text(regex: Pattern, text: str):
+    """Returns a ``(linepos, tag, associates, text)`` record for every todo in a text
+
+    The whole text is scanned at once and line numbers are worked out by counting the newlines between
+    matches, which gives the same result as searching every line on its own since no part of the regex
+    can match a newline and the text of a todo always runs until the end of its line
+    """
+    if _EXTRA_LINE_BREAKS.search(text):
+        return _parse_lines(regex, text)
+    records = []
+    linepos, position = 1, 0
+    for match in regex.finditer(text):
+        start = match.start()
+        linepos += text.count("\n", position, start)
+        position = start
+        records.append((linepos, match.group("tag"), match.group("associates"), match.group("text")))
+    return records
+
+
+@lru_cache(maxsize=None)
+def _compile_regex(re_tags: str, comment_tokens: Tuple[str, ...]) -> Pattern:
+    """Compiles the regex that finds todos in comments that start with any of the comment tokens"""
+    re_comments = "|".join(re.escape(i) for i in comment_tokens)
+    # [^\S\n] is any whitespace except newlines, so a match never spans more than one line
+    return re.compile(
+        rf"({re_comments})[^\S\n]*"                 # comment start (required)
+        rf"(?P<tag>{re_tags})[^\S\n]*"             # valid tags (required)
+        r"\(?(?P<associates>[A-Za-z0-9@#, ]*)\)?"  # people assigned (optional)
+        r"[^\S\n]*[-:~,]"                          # separator: a hyphen, colon, comma, dot or tilde (required)
+        r"[^\S\n]*(?P<text>.*)"                    # text (required)
+        r"[^\S\n]*(-->|\*/)?",                     # comment end (optional)
+        re.IGNORECASE,  # Ignore the case whether it's todo or TODO.
+    )
+
+
+def _regex_for(re_tags: str, file: str) -> Pattern:
+    """Returns the regex for the language of a file, which only matches that language's comments"""
+    extension = os.path.splitext(file)[1][1:]
+    language = _LANGUAGES.get(extension) or _LANGUAGES.get(extension.lower())
+    return _compile_regex(re_tags, COMMENT_TOKENS.get(language, GENERIC_COMMENT_TOKENS))
+
+
+def _is_source_file(name: str) -> bool:
+    """Checks whether a file is in a known language and not hidden"""
+    return os.path.splitext(name)[1][1:] in _LANGUAGES and not any(i.startswith(".") for i in name.split("/"))
+
+
+def _sniff(head: bytes) -> Optional[str]:
+    """Returns the encoding of a file from its first bytes, or None if it looks like a binary file"""
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    if b"\0" in head:
+        return None
+    return "utf-8"
+
+
+def _translate_newlines(text: str) -> str:
+    """Translates newlines the same way as opening the file in text mode would"""
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _parse_stream(regex: Pattern, f, head: bytes, encoding: str):
+    """Returns the records of a file read a chunk at a time, so that it never has to fit in memory
+
+    Every chunk is cut after its last line break and the rest is carried over to the next chunk
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    records, replaced = [], False
+    linepos, pending = 0, ""
+    chunk = head
+    while True:
+        state = decoder.getstate()
+        try:
+            text = decoder.decode(chunk, final=not chunk)
+        except UnicodeDecodeError:
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            decoder.setstate(state)
+            text = decoder.decode(chunk, final=not chunk)
+            replaced = True
+        text = pending + text
+        if chunk:
+            # A \r at the very end may be the first half of a \r\n
+            cut = max(text.rfind("\n"), text.rfind("\r", 0, len(text) - 1)) + 1
+            text, pending = text[:cut], text[cut:]
+        text = _translate_newlines(text)
+        for record in _parse_text(regex, text):
+            records.append((record[0] + linepos,) + record[1:])
+        if not chunk:
+            return records, "replaced" if replaced else None
+        linepos += len(text.splitlines()) if _EXTRA_LINE_BREAKS.search(text) else text.count("\n")
+        chunk = f.read(STREAM_CHUNK_SIZE)
+
+
+def _mark(marks: Optional[list], bytes_read: int):
+    """Marks the end of reading a file, if it's being timed"""
+    if marks is not None:
+        marks.append((clock(), bytes_read))
+
+
+def _read_and_parse(options, file, marks: Optional[list], member=None):
+    """Reads and parses a file, or the archive member ``member`` when it's given as a ``(file object, size)`` pair"""
+    try:
+        if member is not None:
+            return _read_open(options, file, marks, *member, mappable=False)
+        with open(file, "rb") as f:
+            return _read_open(options, file, marks, f, os.fstat(f.fileno()).st_size, mappable=True)
+    except OSError:
+        _mark(marks, 0)
+        return [], "unreadable"
+
+
+def _read_open(options, file, marks: Optional[list], f, size: int, *, mappable: bool):
+    regex = _regex_for(options[0], file)
+    prefilter, max_file_size, oversized = options[1:4]
+    head = f.read(SNIFF_SIZE)
+    encoding = _sniff(head)
+    if encoding is None:
+        _mark(marks, len(head))
+        return [], "binary"
+    if max_file_size is not None and size > max_file_size:
+        if oversized == "skip":
+            _mark(marks, 0)
+            return [], "oversized"
+        # Streamed files are read while they are matched, so all of their time counts as matching
+        _mark(marks, size)
+        return _parse_stream(regex, f, head, encoding)
+    # The tags can only be found in the raw bytes if the encoding is compatible with ascii
+    if not encoding.startswith("utf-8"):
+        prefilter = None
+    if mappable and size >= MMAP_THRESHOLD:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            found = prefilter is None or prefilter.search(data) is not None
+            data = data[:] if found else b""
+    else:
+        data = head + f.read()
+        found = prefilter is None or prefilter.search(data) is not None
+    _mark(marks, size)
+    if not found:
+        return [], None
+    try:
+        text, status = data.decode(encoding), None
+    except UnicodeDecodeError:
+        text, status = data.decode(encoding, errors="replace"), "replaced"
+    return _parse_text(regex, _translate_newlines(text)), status
+
+
+def _parse_file(options, file, member=None):
+    """Returns the ``(linepos, tag, associates, text)`` records of a file, how reading it went and its timings
+
+    How reading it went is None if nothing went wrong, ``"replaced"`` if characters that couldn't be
+    decoded were replaced, or why the file was skipped: ``"binary"``, ``"oversized"`` or ``"unreadable"``.
+    The timings are None unless the options ask for them, and otherwise
+    ``(read_wall, read_cpu, match_wall, match_cpu, bytes_read)``. Archive members are read from ``member``,
+    see _read_and_parse
+    """
+    if not options[4]:
+        return _read_and_parse(options, file, None, member) + (None,)
+    marks = []
+    start_wall, start_cpu = clock()
+    records, status = _read_and_parse(options, file, marks, member)
+    end_wall, end_cpu = clock()
+    (read_wall, read_cpu), bytes_read = marks[0]
+    return records, status, (
+        read_wall - start_wall, read_cpu - start_cpu, end_wall - read_wall, end_cpu - read_cpu, bytes_read
+    )
+
+
+def _init_worker(options):
+    global _worker_options
+    _worker_options = options
+
+
+def _parse_in_worker(file):
+    return (file,) + _parse_file(_worker_options, file)
+
+
+@lru_cache(maxsize=None)
+def _compile_prefilter(tags: Tuple[str, ...]) -> Optional[Pattern]:
+    """Compiles a case insensitive bytes regex that finds any of the tags
+
+    Returns None when the tags can't be matched on bytes the same way as on text, in which case no
+    file is skipped
+    """
+    re_tags = "|".join(tags)
+    if any(ord(i) > 127 for i in re_tags):
+        return None
+    try:
+        return re.compile(re_tags.encode("ascii"), re.IGNORECASE)
+    except re.error:
+        return None
+
 
 class Parser:
     """A class for reading and parsing todos from files"""
 
     default_tags = ("TODO", "FIXME", "BUG", "HACK", "UNDONE", "XXX")
+    # Below this many files starting a process pool costs more than it saves
+    parallel_threshold = 64
+    # The reasons files are skipped for, see _parse_file
+    skipped_reasons = ("binary", "oversized", "unreadable")
 
-    def __init__(self, files, *, tags=None):
+    def __init__(
+        self,
+        files,
+        *,
+        tags=None,
+        jobs=None,
+        cache: ParseCache = None,
+        max_file_size=None,
+        oversized="stream",
+        stats: Stats = None,
+        member_filter: Callable[[str], bool] = None,
+    ):
         self.files = files
         self.tags = tags
+        self.cache = cache
+        # 0 means one process per CPU, None or 1 means parse in this process
+        self.jobs = (os.cpu_count() or 1) if jobs == 0 else (jobs or 1)
         re_tags = "|".join(tags or self.default_tags)
 
-        self.regex = re.compile(
-            r"(//|\#|<--|<!--|/\*|;|--)\s*"            # comment start (required)
-            rf"(?P<tag>{re_tags})\s*"                  # valid tags (required)
-            r"\(?(?P<associates>[A-Za-z0-9@#, ]*)\)?"  # people assigned (optional)
-            r"\s*[-:~,]"                               # separator: a hyphen, colon, comma, dot or tilde (required)
-            r"\s*(?P<text>.*)"                         # text (required)
-            r"\s*(-->|\*/)?",                          # comment end (optional)
-            re.IGNORECASE,  # Ignore the case whether it's todo or TODO.
+        # Files of known languages are parsed with a regex that only matches their own comments, see _regex_for
+        self.regex = _compile_regex(re_tags, GENERIC_COMMENT_TOKENS)
+        # Files that don't contain any of the tags are skipped before they are decoded
+        self.prefilter = _compile_prefilter(tuple(tags or self.default_tags))
+        # Files bigger than max_file_size bytes are either skipped or streamed, depending on oversized
+        if oversized not in ("skip", "stream"):
+            raise ValueError(f"oversized has to be skip or stream, not {oversized}")
+        self.stats = stats
+        # Which files inside archives are parsed, by default the ones in a known language
+        self.member_filter = member_filter or _is_source_file
+        self.options = (re_tags, self.prefilter, max_file_size, oversized, stats is not None)
+        self.cache_namespace = ParseCache.namespace(
+            self.regex.pattern, self.regex.flags, sorted(COMMENT_TOKENS.items()), max_file_size, oversized
         )
+        # How many files were skipped for each reason and how many had characters replaced
+        self.skipped = Counter()
+        self.replaced = 0
         self.todos = []
 
-    def parse(self):
-        """Does the actual parsing"""
-        for file in self.files:
-            with open(file, encoding="utf-8") as f:
-                lines = f.read().splitlines()
-                for linepos, line in enumerate(lines, 1):
-                    match = self.regex.search(line)
-                    if not match:
+    def _count(self, status):
+        if status == "replaced":
+            self.replaced += 1
+        elif status is not None:
+            self.skipped[status] += 1
+
+    def _measure(self, file, records, status, timings, *, nested):
+        stats = self.stats
+        if timings is None:
+            stats.count("cached")
+        else:
+            read_wall, read_cpu, match_wall, match_cpu, bytes_read = timings
+            stats.add("read", read_wall, read_cpu, nested=nested)
+            stats.add("match", match_wall, match_cpu, nested=nested)
+            stats.file(file, read_wall + match_wall)
+            stats.count("bytes", bytes_read)
+            stats.count("skipped" if status in self.skipped_reasons else "read")
+        if records:
+            stats.count("matched")
+            stats.count("todos", len(records))
+
+    def _parse_cached(self, file):
+        if self.cache is None:
+            return (file,) + _parse_file(self.options, file)
+        key = self.cache.key(file)
+        cached = self.cache.get(self.cache_namespace, file, key)
+        if cached is not None:
+            return (file,) + cached + (None,)
+        records, status, timings = _parse_file(self.options, file)
+        # Skipped files aren't cached so that they are counted every time
+        if status not in self.skipped_reasons:
+            self.cache.put(self.cache_namespace, file, key, records, status)
+        return file, records, status, timings
+
+    def _iter_records_parallel(self, files):
+        import multiprocessing
+
+        with multiprocessing.Pool(self.jobs, initializer=_init_worker, initargs=(self.options,)) as pool:
+            if self.cache is None:
+                yield from pool.imap(_parse_in_worker, files, chunksize=16)
+                return
+            # Cached files are looked up here in batches and only the rest are sent to the workers
+            while True:
+                batch = list(islice(files, self.jobs * 64))
+                if not batch:
+                    return
+                keys = {file: self.cache.key(file) for file in batch}
+                cached = {file: self.cache.get(self.cache_namespace, file, keys[file]) for file in batch}
+                missing = [file for file in batch if cached[file] is None]
+                parsed = {result[0]: result[1:] for result in pool.imap(_parse_in_worker, missing, chunksize=4)}
+                for file in batch:
+                    if cached[file] is not None:
+                        yield (file,) + cached[file] + (None,)
                         continue
-                    self.todos.append(Todo(match, file_name=file, linepos=linepos))
+                    records, status, timings = parsed[file]
+                    if status not in self.skipped_reasons:
+                        self.cache.put(self.cache_namespace, file, keys[file], records, status)
+                    yield file, records, status, timings
+
+    def _iter_archive(self, archive):
+        """Parses the members of an archive one at a time in this process, as they can only be read in order"""
+        try:
+            for name, f, size in iter_members(archive, self.member_filter):
+                yield (member_path(archive, name),) + _parse_file(self.options, name, (f, size))
+        except archive_errors() as exc:
+            print(f"Failed to read {archive} due to {exc}", file=sys.stderr)
+            timings = (0.0, 0.0, 0.0, 0.0, 0) if self.stats is not None else None
+            yield archive, [], "unreadable", timings
+
+    def _iter_results(self, files):
+        """Yields the results of the files, with whether they were parsed in this process"""
+        files = iter(files)
+        head = list(islice(files, self.parallel_threshold + 1))
+        files = chain(head, files)
+        serial = self.jobs < 2 or len(head) <= self.parallel_threshold
+        if serial:
+            return map(self._parse_cached, files), serial
+        return self._iter_records_parallel(files), serial
+
+    def _iter_records(self, files):
+        """Yields ``(file, records)`` for every file and archive member, in the same order as ``files``"""
+        try:
+            # Runs of files share one pool of processes while archives are read in between them
+            for archive, group in groupby(files, key=is_archive):
+                if archive:
+                    yield from self._iter_counted(chain.from_iterable(map(self._iter_archive, group)), serial=True)
+                else:
+                    yield from self._iter_counted(*self._iter_results(group))
+        finally:
+            if self.cache is not None:
+                self.cache.flush()
+
+    def _iter_counted(self, results, serial: bool):
+        """Counts and measures the results of files and yields their ``(file, records)``"""
+        for file, records, status, timings in results:
+            self._count(status)
+            if self.stats is not None:
+                # Files parsed in this process were parsed inside the phase that is running now
+                self._measure(file, records, status, timings, nested=serial)
+            yield file, records
+
+    def iter_parse_files(self, files: Iterable[str]) -> Iterator[Tuple[str, List[Todo]]]:
+        """Yields every file together with its todos, including the files without any todos"""
+        for file, records in self._iter_records(files):
+            yield file, [Todo.from_record(record, file_name=file) for record in records]
+
+    def iter_parse(self) -> Iterator[Todo]:
+        """Yields todos one by one as they are parsed, without storing them"""
+        for file, records in self._iter_records(self.files):
+            for record in records:
+                yield Todo.from_record(record, file_name=file)
+
+    def iter_parse_revisions(self, repository: str, revs: Iterable[str]) -> Iterator[Tuple[str, List[Todo]]]:
+        """Yields every file in git revisions of a repository together with its todos, reported as ``rev:path``
+
+        Files are read from the object database without checking anything out and files that are the same in
+        several revisions are only parsed once, see revision.iter_revision_results
+        """
+        from .revision import Repository, iter_revision_results
+
+        def parse(name, f, size):
+            return _parse_file(self.options, name, (f, size))
+
+        with Repository(repository) as repo:
+            results = iter_revision_results(repo, revs, parse, self.member_filter)
+            for file, records in self._iter_counted(results, serial=True):
+                yield file, [Todo.from_record(record, file_name=file) for record in records]
+
+    def parse_store(self) -> TodoStore:
+        """Parses the todos into a columnar store, without creating an object for every todo"""
+        return TodoStore.from_records(self._iter_records(self.files))
+
+    def parse(self) -> List[Todo]:
+        """Does the actual parsing, parsing again replaces the todos of the last time"""
+        self.todos = list(self.iter_parse())
         return self.todos
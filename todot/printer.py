@@ -1,97 +1,212 @@
 """Prints todos to various outputs and formats"""
-from typing import List
+import os
+import stat
+import sys
+from collections.abc import Sequence
+from importlib.util import find_spec
+from itertools import chain, islice
+from typing import Iterable, Iterator, Tuple
 
-from .todo import Todo
+from . import __version__
+from .todo import Todo, iter_fingerprints
 
-try:
-    import rich
-except ImportError:
-    rich = None
+# rich is slow to import so it is only imported once something is printed in colour, until then this
+# only tells whether it is installed
+rich = True if find_spec("rich") is not None else None
+
+# How many characters of output are collected before they are written at once
+CHUNK_SIZE = 64 * 1024
+
+
+def _name_width(todo: Todo) -> int:
+    return len(f"{todo.file_name}:{todo.linepos} ")
+
+
+def _blame(todo: Todo, template: str = " [{author}, {date}]") -> str:
+    """Formats who wrote a todo found with --blame and on which day, or returns an empty string"""
+    author = getattr(todo, "author", None)
+    if author is None:
+        return ""
+    return template.format(author=author, date=(todo.date or "")[:10])
+
+
+def _iter_padded(todos: Iterable[Todo], lookahead: int) -> Iterator[Tuple[Todo, int]]:
+    """Pairs every todo with the padding size needed to align it
+
+    Lists are measured in full, stores provide their precomputed width and other iterables are measured
+    from the first ``lookahead`` todos and the padding only grows afterwards so that nothing has to be
+    kept in memory
+    """
+    name_width = getattr(todos, "name_width", None)
+    if name_width is not None:
+        for todo in todos:
+            yield todo, name_width
+        return
+    if isinstance(todos, Sequence):
+        padding_size = max(map(_name_width, todos), default=0)
+        for todo in todos:
+            yield todo, padding_size
+        return
+    todos = iter(todos)
+    head = list(islice(todos, lookahead))
+    padding_size = max(map(_name_width, head), default=0)
+    for todo in chain(head, todos):
+        padding_size = max(padding_size, _name_width(todo))
+        yield todo, padding_size
+
+
+def _iter_chunks(lines: Iterable[str], chunk_size: int = None) -> Iterator[str]:
+    """Joins lines into chunks of about ``chunk_size`` or CHUNK_SIZE characters, every line ending with a newline"""
+    chunk_size = chunk_size or CHUNK_SIZE
+    chunk, size = [], 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line) + 1
+        if size >= chunk_size:
+            chunk.append("")
+            yield "\n".join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        chunk.append("")
+        yield "\n".join(chunk)
+
+
+def _is_read_live(stream) -> bool:
+    """Checks whether a stream is read while it is written, such as a terminal or a pipe"""
+    try:
+        if stream.isatty():
+            return True
+        mode = os.fstat(stream.fileno()).st_mode
+    except (AttributeError, OSError, ValueError):
+        return False
+    return stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode)
+
+
+def _write_stdout(lines: Iterable[str]):
+    """Writes lines to stdout, straight to its binary buffer when it has one
+
+    Lines are written in big chunks to files, while terminals and pipes get every line as soon as it is
+    formatted so that the first todos show up without waiting for the rest
+    """
+    stdout = sys.stdout
+    chunk_size = 1 if _is_read_live(stdout) else None
+    buffer = getattr(stdout, "buffer", None)
+    if buffer is None:
+        for chunk in _iter_chunks(lines, chunk_size):
+            stdout.write(chunk)
+            stdout.flush()
+        return
+    encoding = getattr(stdout, "encoding", None) or "utf-8"
+    errors = getattr(stdout, "errors", None) or "strict"
+    # Anything already printed has to come out first
+    stdout.flush()
+    for chunk in _iter_chunks(lines, chunk_size):
+        if os.linesep != "\n":
+            chunk = chunk.replace("\n", os.linesep)
+        buffer.write(chunk.encode(encoding, errors))
+        buffer.flush()
 
 
 class ConsolePrinter:
     """Prints todos to the console"""
 
-    def __init__(self, todos: List[Todo]):
+    # How many streamed todos are read ahead to work out the padding
+    lookahead = 1000
+
+    def __init__(self, todos: Iterable[Todo]):
         self.todos = todos
         self.to_print = []
 
+    def format_todo(self, todo: Todo, padding_size: int) -> str:
+        """Formats a single todo"""
+        associates = (" (" + ", ".join(todo.associates) + ")") if todo.associates else ""
+        current_name = len(todo.file_name + str(todo.linepos) + " ")
+        return (
+            f"{todo.file_name}:{todo.linepos} "
+            f"{' '*(padding_size-current_name)}{todo.tag}"
+            f"{associates}: {todo.text}{_blame(todo)}"
+        )
+
+    def iter_format(self) -> Iterator[str]:
+        """Formats the todos one by one as they arrive"""
+        found = False
+        for todo, padding_size in _iter_padded(self.todos, self.lookahead):
+            found = True
+            yield self.format_todo(todo, padding_size)
+        if not found:
+            print("No todos found.")
+
     def format(self):
         """Formats the todos to be printable"""
-        if not self.todos:
-            print("No todos found.")
-            return
-        longest_name = max(self.todos, key=lambda t: len(f"{t.file_name}:{t.linepos} "))
-        padding_size = len(f"{longest_name.file_name}:{longest_name.linepos} ")
-        for todo in self.todos:
-            associates = (" (" + ", ".join(todo.associates) + ")") if todo.associates else ""
-            current_name = len(todo.file_name + str(todo.linepos) + " ")
-            self.to_print.append(
-                f"{todo.file_name}:{todo.linepos} "
-                f"{' '*(padding_size-current_name)}{todo.tag}"
-                f"{associates}: {todo.text}"
-            )
+        self.to_print.extend(self.iter_format())
 
-    def print(self):
-        """Does the actual printing"""
-        self.format()
-        for todo in self.to_print:
-            print(todo)
+    def print(self, lines: Iterable[str] = None):
+        """Does the actual printing
+
+        ``lines`` are the formatted todos to print, iter_format by default, such as when it is measured
+        """
+        _write_stdout(self.iter_format() if lines is None else lines)
 
 
-class ColoredConsolePrinter:
+class ColoredConsolePrinter(ConsolePrinter):
     """Prints todos to the console"""
 
-    def __init__(self, todos: List[Todo]):
-        self.todos = todos
-        self.to_print = []
+    def __init__(self, todos: Iterable[Todo]):
+        super().__init__(todos)
+        # Turned off when printing to something other than a terminal, such as a file or a pipe
+        self.colored = True
 
-    def format(self):
-        """Formats the todos to be printable"""
-        if not self.todos:
-            print("No todos found.")
-            return
-        longest_name = max(self.todos, key=lambda t: len(f"{t.file_name}:{t.linepos} "))
-        padding_size = len(f"{longest_name.file_name}:{longest_name.linepos} ")
-        for todo in self.todos:
-            associates = (" (" + ", ".join(todo.associates) + ")") if todo.associates else ""
-            current_name = len(todo.file_name + str(todo.linepos) + " ")
-            if rich:
-                self.to_print.append(
-                    f"[bold yellow]{todo.file_name}:{todo.linepos}[/]"
-                    f"[bold green]{' '*(padding_size-current_name)}{todo.tag}[/]"
-                    f"[bold cyan]{associates}[/]: {todo.text}"
-                )
-            else:
-                self.to_print.append(
-                    f"\x1b[1;33m{todo.file_name}:{todo.linepos}\x1b[0m "
-                    f"\x1b[1;32m{' '*(padding_size-current_name)}{todo.tag}\x1b[0m"
-                    f"\x1b[1;36m{associates}\x1b[0m: {todo.text}"
-                )
-
-    def print(self):
+    def format_todo(self, todo: Todo, padding_size: int) -> str:
+        if not self.colored:
+            return super().format_todo(todo, padding_size)
+        associates = (" (" + ", ".join(todo.associates) + ")") if todo.associates else ""
+        current_name = len(todo.file_name + str(todo.linepos) + " ")
+        blame = _blame(todo)
+        if rich:
+            from rich.markup import escape
+
+            return (
+                f"[bold yellow]{escape(todo.file_name)}:{todo.linepos}[/]"
+                f"[bold green]{' '*(padding_size-current_name)}{todo.tag}[/]"
+                f"[bold cyan]{escape(associates)}[/]: {escape(todo.text)}"
+                + (f"[dim]{escape(blame)}[/]" if blame else "")
+            )
+        return (
+            f"\x1b[1;33m{todo.file_name}:{todo.linepos}\x1b[0m "
+            f"\x1b[1;32m{' '*(padding_size-current_name)}{todo.tag}\x1b[0m"
+            f"\x1b[1;36m{associates}\x1b[0m: {todo.text}"
+            + (f"\x1b[2m{blame}\x1b[0m" if blame else "")
+        )
+
+    def print(self, lines: Iterable[str] = None):
         """Does the actual printing"""
-        self.format()
-        for todo in self.to_print:
-            if rich:
-                rich.print(todo)
-            else:
-                print(todo)
+        self.colored = sys.stdout.isatty()
+        if not self.colored or not rich:
+            super().print(lines)
+            return
+        from rich.console import Console
+
+        # The markup of a whole chunk is rendered at once instead of one todo at a time, lines are left for
+        # the terminal to wrap since measuring them is most of the cost of rendering
+        console = Console(highlight=False)
+        for chunk in _iter_chunks(self.iter_format() if lines is None else lines):
+            console.print(chunk, end="", soft_wrap=True)
 
 
 class TextFilePrinter(ConsolePrinter):
     """Prints todos to a text file"""
 
-    def __init__(self, todos: List[Todo], file_name: str):
+    def __init__(self, todos: Iterable[Todo], file_name: str):
         super().__init__(todos)
         self.file_name = file_name or "todo.txt"
 
-    def print(self):
-        self.format()
+    def print(self, lines: Iterable[str] = None):
+        written = False
         with open(self.file_name, "w", encoding="utf-8") as file:
-            for todo in self.to_print:
-                file.write(todo + "\n")
-        if self.todos:
+            for chunk in _iter_chunks(self.iter_format() if lines is None else lines):
+                file.write(chunk)
+                written = True
+        if written:
             print(f"Successfully saved all todos to {self.file_name}")
 
 
@@ -100,42 +215,142 @@ class MarkdownFilePrinter(TextFilePrinter):
 
     def __init__(
         self,
-        todos: List[Todo],
+        todos: Iterable[Todo],
         file_name: str,
     ):
         super().__init__(todos, file_name or "TODO.md")
 
-    def format(self):
-        """Formats the todos to be printable"""
-        if not self.todos:
-            print("No todos found.")
-            return
-        self.to_print.append("# TODO.md\n")
+    def format_todo(self, todo: Todo, padding_size: int = 0) -> str:
+        associates = ", ".join("@" + i for i in todo.associates) if todo.associates else ""
+        blame = _blame(todo, " by {author} on {date}")
+        return f"- {todo.text} #{todo.tag} {associates} ({todo.file_name}:{todo.linepos}){blame}  "
+
+    def iter_format(self) -> Iterator[str]:
+        """Formats the todos one by one as they arrive"""
+        found = False
         for todo in self.todos:
-            associates = ", ".join("@" + i for i in todo.associates) if todo.associates else ""
-            self.to_print.append(f"- {todo.text} #{todo.tag} {associates} ({todo.file_name}:{todo.linepos})  ")
+            if not found:
+                found = True
+                yield "# TODO.md\n"
+            yield self.format_todo(todo)
+        if not found:
+            print("No todos found.")
 
 
 class GithubFlavouredMarkdownFilePrinter(MarkdownFilePrinter):
     """Prints todos to a markdown file"""
 
-    def __init__(self, todos: List[Todo], file_name: str, repo: str, branch: str = None):
+    def __init__(self, todos: Iterable[Todo], file_name: str, repo: str, branch: str = None):
         super().__init__(todos, file_name or "TODO.md")
         self.repo = repo
         self.branch = branch or "master"
 
-    def format(self):
-        """Formats the todos to be printable"""
-        if not self.todos:
-            print("No todos found.")
+    def format_todo(self, todo: Todo, padding_size: int = 0) -> str:
+        associates = ", ".join("@" + i for i in todo.associates) if todo.associates else ""
+        if self.repo:
+            filename = todo.file_name.replace("\\", "/")
+            file = f"[{todo.file_name}:{todo.linepos}]({self.repo}/blob/{self.branch}/{filename}#L{todo.linepos})"
+        else:
+            file = f"{todo.file_name}:{todo.linepos}"
+        return f"- [ ] {todo.text} #{todo.tag} {associates} ({file}){_blame(todo, ' by {author} on {date}')}  "
+
+
+class NdjsonPrinter:
+    """Prints every todo as a JSON object on its own line as soon as it is parsed"""
+
+    def __init__(self, todos: Iterable[Todo], file_name: str = None):
+        self.todos = todos
+        self.file_name = file_name
+
+    def iter_format(self) -> Iterator[str]:
+        """Formats the todos one by one as they arrive"""
+        import json
+
+        for todo, todo_fingerprint in iter_fingerprints(self.todos):
+            data = todo.to_dict()
+            data["fingerprint"] = todo_fingerprint
+            yield json.dumps(data, ensure_ascii=False)
+
+    def print(self, lines: Iterable[str] = None):
+        """Does the actual printing, to the file if there is one or else to stdout"""
+        if lines is None:
+            lines = self.iter_format()
+        if not self.file_name:
+            _write_stdout(lines)
             return
-        self.to_print.append("# TODO.md\n")
+        with open(self.file_name, "w", encoding="utf-8") as file:
+            for chunk in _iter_chunks(lines):
+                file.write(chunk)
 
-        for todo in self.todos:
-            associates = ", ".join("@" + i for i in todo.associates) if todo.associates else ""
-            if self.repo:
-                filename = todo.file_name.replace("\\", "/")
-                file = f"[{todo.file_name}:{todo.linepos}]({self.repo}/blob/{self.branch}/{filename}#L{todo.linepos})"
-            else:
-                file = f"{todo.file_name}:{todo.linepos}"
-            self.to_print.append(f"- [ ] {todo.text} #{todo.tag} {associates} ({file})  ")
+
+class DeltaPrinter(NdjsonPrinter):
+    """Prints the todos that were removed and added since a baseline, as ``-`` and ``+`` lines or as JSON
+
+    The todos come paired with their fingerprints, which can't be worked out again from only the changed todos
+    """
+
+    def __init__(
+        self,
+        added: Iterable[Tuple[Todo, str]],
+        removed: Iterable[Tuple[Todo, str]],
+        file_name: str = None,
+        *,
+        as_json: bool = False,
+    ):
+        super().__init__([], file_name)
+        self.added = added
+        self.removed = removed
+        self.as_json = as_json
+        self._console = ConsolePrinter(())
+
+    def iter_format(self) -> Iterator[str]:
+        """Formats the removed todos and then the added ones"""
+        import json
+
+        for change, prefix, todos in (("removed", "-", self.removed), ("added", "+", self.added)):
+            for todo, todo_fingerprint in todos:
+                if not self.as_json:
+                    yield f"{prefix} {self._console.format_todo(todo, 0)}"
+                    continue
+                data = todo.to_dict()
+                data["fingerprint"] = todo_fingerprint
+                data["change"] = change
+                yield json.dumps(data, ensure_ascii=False)
+
+
+class SarifPrinter(NdjsonPrinter):
+    """Prints the todos as a SARIF log that code scanning tools can read
+
+    The log is written as the todos arrive, so only the header is kept in memory
+    """
+
+    def iter_format(self) -> Iterator[str]:
+        """Formats the todos one by one as they arrive, as the lines of one JSON document"""
+        import json
+
+        driver = {"name": "todot", "version": __version__, "informationUri": "https://wasi-master.github.io/todot/"}
+        yield "{"
+        yield '  "$schema": "https://json.schemastore.org/sarif-2.1.0.json",'
+        yield '  "version": "2.1.0",'
+        yield f'  "runs": [{{"tool": {{"driver": {json.dumps(driver)}}}, "results": ['
+        separator = ""
+        for todo, todo_fingerprint in iter_fingerprints(self.todos):
+            result = {
+                "ruleId": todo.tag.upper(),
+                "level": "note",
+                "message": {"text": todo.text},
+                "locations": [{
+                    "physicalLocation": {
+                        "artifactLocation": {"uri": todo.file_name.replace("\\", "/")},
+                        "region": {"startLine": todo.linepos},
+                    }
+                }],
+                "partialFingerprints": {"todot/v1": todo_fingerprint},
+                "properties": {"tag": todo.tag, "associates": list(todo.associates)},
+            }
+            if hasattr(todo, "author"):
+                result["properties"].update(author=todo.author, date=todo.date)
+            yield f"{separator}    {json.dumps(result, ensure_ascii=False)}"
+            separator = ","
+        yield "  ]}]"
+        yield "}"
@@ -0,0 +1,112 @@
+"""Reads the files of git revisions straight from the object database, without checking them out"""
+import io
+import os
+import subprocess
+import sys
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+__all__ = ("Repository", "iter_revision_results")
+
+
+class Repository:
+    """A git repository whose revisions are read with ``git ls-tree`` and one long-lived ``git cat-file --batch``
+
+    Paths are relative to ``path``, which can also be a directory inside the repository to only read the
+    files inside it
+    """
+
+    def __init__(self, path: str = "."):
+        self.path = path
+        self._process: Optional[subprocess.Popen] = None
+
+    def iter_tree(self, rev: str) -> Iterator[Tuple[str, str, int]]:
+        """Yields ``(path, object id, size)`` for every regular file in a revision
+
+        Raises OSError if the revision can't be listed, such as when it doesn't exist
+        """
+        process = subprocess.run(
+            ["git", "-C", self.path, "ls-tree", "-r", "-z", "--long", rev],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        if process.returncode != 0:
+            raise OSError(process.stderr.decode("utf-8", "replace").strip() or f"Failed to list {rev}")
+        for entry in process.stdout.split(b"\0"):
+            if not entry:
+                continue
+            info, _, path = entry.partition(b"\t")
+            mode, kind, oid, size = info.split()
+            # Symlinks and submodules don't have any contents to parse
+            if kind != b"blob" or mode == b"120000":
+                continue
+            yield os.fsdecode(path), oid.decode("ascii"), int(size)
+
+    def read_blob(self, oid: str) -> Optional[bytes]:
+        """Reads the contents of a blob, or returns None if it doesn't exist"""
+        if self._process is None:
+            self._process = subprocess.Popen(
+                ["git", "-C", self.path, "cat-file", "--batch"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        self._process.stdin.write(oid.encode("ascii") + b"\n")
+        self._process.stdin.flush()
+        # Either "<oid> <type> <size>" followed by the contents and a newline, or "<oid> missing"
+        header = self._process.stdout.readline().split()
+        if len(header) != 3:
+            if not header:
+                raise OSError("git cat-file stopped unexpectedly")
+            return None
+        data = self._process.stdout.read(int(header[2]) + 1)
+        return data[:-1]
+
+    def close(self):
+        """Stops git cat-file"""
+        if self._process is None:
+            return
+        self._process.stdin.close()
+        self._process.wait()
+        self._process.stdout.close()
+        self._process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def iter_revision_results(
+    repository: Repository, revs: Iterable[str], parse: Callable, accepts: Callable[[str], bool]
+) -> Iterator[Tuple[str, List[tuple], Optional[str], Optional[tuple]]]:
+    """Yields the parse results of the accepted files in every revision, reported as ``rev:path``
+
+    ``parse`` is called with the path, a file object and its size. Blobs that are in several revisions are
+    read and parsed once, and come out afterwards without timings the same way as cached files. Revisions
+    that can't be read are reported and left out
+    """
+    parsed: Dict[Tuple[str, str], Tuple[List[tuple], Optional[str]]] = {}
+    for rev in revs:
+        try:
+            tree = list(repository.iter_tree(rev))
+        except OSError as exc:
+            print(f"Failed to read {rev} due to {exc}", file=sys.stderr)
+            continue
+        for path, oid, size in tree:
+            if not accepts(path):
+                continue
+            name = f"{rev}:{os.path.normpath(os.path.join(repository.path, path))}"
+            # The extension picks the comment syntax, so the same blob can parse differently under other names
+            key = (oid, os.path.splitext(path)[1])
+            result = parsed.get(key)
+            if result is not None:
+                yield (name,) + result + (None,)
+                continue
+            data = repository.read_blob(oid)
+            if data is None:
+                yield name, [], "unreadable", None
+                continue
+            records, status, timings = parse(path, io.BytesIO(data), size)
+            parsed[key] = (records, status)
+            yield name, records, status, timings
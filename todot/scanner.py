@@ -0,0 +1,115 @@
+"""Finds and parses todos with a configuration that is set up once and reused for every scan"""
+import os
+from typing import Iterable, Iterator, List, Union
+
+from .cache import ParseCache
+from .finder import Finder, Visited
+from .parser import Parser
+from .stats import Stats
+from .todo import Todo
+
+__all__ = ("Scanner",)
+
+# A path or a list of paths to scan
+Paths = Union[str, os.PathLike, Iterable[Union[str, os.PathLike]]]
+
+
+class Scanner:
+    """Finds and parses the todos of files and directories, for using todot from other programs
+
+    The configuration is checked and the regexes are compiled once, and every scan uses its own finders
+    and parser, so a scanner holds no state between scans and can be shared by several threads::
+
+        scanner = Scanner(tags=["TODO", "FIXME"], exclude=["build"], gitignore=True)
+        for todo in scanner.scan("src"):
+            print(todo)
+    """
+
+    def __init__(
+        self,
+        *,
+        tags=None,
+        filetypes=None,
+        exclude=None,
+        gitignore=False,
+        git_files=None,
+        walk_threads=None,
+        jobs=None,
+        cache: ParseCache = None,
+        max_file_size=None,
+        oversized="stream",
+    ):
+        self.tags = tuple(tags) if tags else None
+        self.filetypes = tuple(filetypes) if filetypes else None
+        self.exclude = tuple(exclude or ())
+        self.gitignore = gitignore
+        self.git_files = git_files
+        self.walk_threads = walk_threads
+        self.jobs = jobs
+        self.cache = cache
+        self.max_file_size = max_file_size
+        self.oversized = oversized
+        # Compiles the regexes and checks the options now instead of on the first scan, the finder also picks
+        # which files inside archives are parsed
+        self._member_finder = self.finder(".")
+        self.parser(())
+
+    def finder(self, path, *, stats: Stats = None) -> Finder:
+        """Creates a finder for a directory with the scanner's configuration"""
+        return Finder(
+            path,
+            filetypes=self.filetypes,
+            exclude=self.exclude,
+            gitignore=self.gitignore,
+            git_files=self.git_files,
+            walk_threads=self.walk_threads,
+            stats=stats,
+        )
+
+    def parser(self, files: Iterable[str], *, stats: Stats = None) -> Parser:
+        """Creates a parser for a list of files with the scanner's configuration"""
+        return Parser(
+            files,
+            tags=self.tags,
+            jobs=self.jobs,
+            cache=self.cache,
+            max_file_size=self.max_file_size,
+            oversized=self.oversized,
+            stats=stats,
+            member_filter=self._member_finder.accepts_member,
+        )
+
+    def find(self, paths: Paths, *, stats: Stats = None) -> Iterator[str]:
+        """Yields the source files inside the paths one path after another
+
+        Files and archives given directly are yielded as they are, and every physical file is only yielded once,
+        for the first path it is found in
+        """
+        if isinstance(paths, (str, os.PathLike)):
+            paths = [paths]
+        visited = Visited()
+        for path in paths:
+            path = os.fspath(path)
+            if not os.path.isfile(path):
+                yield from self.finder(path, stats=stats).iter_find(visited)
+                continue
+            file_stat = os.stat(path)
+            if visited.add((file_stat.st_dev, file_stat.st_ino)):
+                yield path
+
+    def scan(self, paths: Paths = ".", *, stats: Stats = None) -> Iterator[Todo]:
+        """Yields the todos of every source file inside the paths as they are parsed
+
+        All the paths are parsed by one parser, so with ``jobs`` they share one pool of processes, and the
+        todos of each path come out together in the order the paths were given
+        """
+        return self.parser(self.find(paths, stats=stats), stats=stats).iter_parse()
+
+    def scan_revisions(self, revs: Iterable[str], repository=".", *, stats: Stats = None) -> Iterator[Todo]:
+        """Yields the todos of every source file in git revisions, read without checking them out"""
+        for _, todos in self.parser((), stats=stats).iter_parse_revisions(os.fspath(repository), revs):
+            yield from todos
+
+    def scan_file(self, path) -> List[Todo]:
+        """Returns the todos of a single file or archive, whether or not it would be found by a scan"""
+        return [todo for _, todos in self.parser(()).iter_parse_files([os.fspath(path)]) for todo in todos]
@@ -0,0 +1,178 @@
+"""Serves the todos of one or more directories from memory over a local socket"""
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from .finder import Finder
+from .parser import Parser
+from .todo import Todo
+from .watcher import Watcher
+
+__all__ = ("TodoServer", "default_socket_path", "filter_todos", "query")
+
+# The fields todos can be filtered by
+QUERY_FIELDS = ("root", "tag", "associate", "path")
+
+
+def default_socket_path() -> str:
+    """Returns the socket used by default for the current directory"""
+    directory_hash = hashlib.sha1(os.path.abspath(".").encode("utf-8")).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"todot-{directory_hash}.sock")
+
+
+def filter_todos(todos: Iterable[Todo], *, tag=None, associate=None, path=None) -> Iterator[Todo]:
+    """Yields the todos with the given tag and associate whose file starts with the given path"""
+    tag = tag.upper() if tag else None
+    path = path.replace("\\", "/").lstrip("./") if path else None
+    for todo in todos:
+        if tag and todo.tag.upper() != tag:
+            continue
+        if associate and associate not in todo.associates:
+            continue
+        if path and not todo.file_name.replace("\\", "/").startswith(path):
+            continue
+        yield todo
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _ThreadingUnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+else:
+    _ThreadingUnixServer = None
+
+
+class TodoServer:
+    """Holds the todos of one or more directories in memory and keeps them up to date in the background"""
+
+    def __init__(self, finders: List[Finder], parser: Parser, *, polling=False, interval=1.0):
+        self.watchers: Dict[str, Watcher] = {}
+        self._threads = []
+        for finder in finders:
+            watcher = Watcher(finder, parser, polling=polling, interval=interval)
+            self.watchers[str(finder.path)] = watcher
+            thread = threading.Thread(target=self._keep_updated, args=(watcher,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._server = None
+
+    @staticmethod
+    def _keep_updated(watcher: Watcher):
+        for _ in watcher:
+            pass
+
+    def query(self, *, root=None, tag=None, associate=None, path=None) -> List[dict]:
+        """Returns the todos matching the query as dicts"""
+        if root is not None and root not in self.watchers:
+            raise KeyError(f"{root} is not being served")
+        roots = [root] if root is not None else list(self.watchers)
+        todos = []
+        for i in roots:
+            todos.extend(filter_todos(self.watchers[i].index, tag=tag, associate=associate, path=path))
+        return [i.to_dict() for i in todos]
+
+    def handle(self, request: dict) -> dict:
+        """Answers a query, which is a dict with any of the QUERY_FIELDS"""
+        try:
+            return {"todos": self.query(**{i: request.get(i) for i in QUERY_FIELDS})}
+        except KeyError as exc:
+            return {"error": exc.args[0]}
+
+    def serve_unix(self, path: str):
+        """Answers queries sent as a line of JSON over a unix socket until interrupted"""
+        if _ThreadingUnixServer is None:
+            raise OSError("Unix sockets are not supported on this platform, use a port instead")
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            """Reads a query and writes the answer"""
+
+            def handle(self):
+                try:
+                    request = json.loads(self.rfile.readline() or b"{}")
+                except ValueError:
+                    response = {"error": "invalid query"}
+                else:
+                    response = server.handle(request if isinstance(request, dict) else {})
+                self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+        if os.path.exists(path):
+            if query({}, socket_path=path) is not None:
+                raise OSError(f"Another server is already running on {path}")
+            # Left over from a server that didn't shut down cleanly
+            os.unlink(path)
+        self._server = _ThreadingUnixServer(path, Handler)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            os.unlink(path)
+
+    def serve_http(self, port: int):
+        """Answers queries sent as GET /todos?tag=...&associate=... requests on localhost until interrupted"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Reads a query and writes the answer"""
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path != "/todos":
+                    self.send_error(404)
+                    return
+                request = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                body = json.dumps(server.handle(request)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = _ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def shutdown(self):
+        """Stops serving and watching for changes, can be called from another thread"""
+        if self._server is not None:
+            self._server.shutdown()
+        for watcher in self.watchers.values():
+            watcher.stop()
+        for thread in self._threads:
+            thread.join()
+
+
+def query(request: dict, *, socket_path: str = None, port: int = None, timeout=5.0) -> Optional[dict]:
+    """Sends a query to a running server, returning None if no server is running"""
+    request = {key: value for key, value in request.items() if value is not None}
+    try:
+        if port is not None:
+            from urllib.request import urlopen
+
+            with urlopen(f"http://127.0.0.1:{port}/todos?{urlencode(request)}", timeout=timeout) as response:
+                return json.loads(response.read())
+        if not hasattr(socket, "AF_UNIX"):
+            return None
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(socket_path or default_socket_path())
+            client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with client.makefile("rb") as response:
+                return json.loads(response.readline())
+    except (OSError, ValueError):
+        return None
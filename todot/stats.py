@@ -0,0 +1,133 @@
+"""Measures where the time of a run goes"""
+import heapq
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Tuple
+
+__all__ = ("Stats", "clock")
+
+# The CPU time of the current thread, the CPU time of the whole process before python 3.7
+_thread_time = getattr(time, "thread_time", time.process_time)
+
+# The phases of a run in the order they are reported
+PHASES = ("config", "walk", "ignore", "read", "match", "parse", "blame", "format", "output")
+# The counters in the order they are reported, with a description of each
+COUNTERS = {
+    "directories": "directories visited",
+    "considered": "files and directories considered",
+    "ignored": "ignored or excluded",
+    "skipped": "files skipped while reading",
+    "cached": "files read from the cache",
+    "read": "files read",
+    "matched": "files with todos",
+    "bytes": "bytes read",
+    "todos": "todos found",
+}
+
+
+def clock() -> Tuple[float, float]:
+    """Returns the wall time and the CPU time of the current thread"""
+    return time.perf_counter(), _thread_time()
+
+
+class Stats:
+    """Collects the wall and CPU time spent in each phase of a run, counters and the slowest files
+
+    Phases can be nested and only count the time spent in them and not in the phases inside them, time
+    measured in other threads and processes is added up so the total can be more than the run took
+    """
+
+    def __init__(self, top: int = 10):
+        self.top = top
+        self.wall = dict.fromkeys(PHASES, 0.0)
+        self.cpu = dict.fromkeys(PHASES, 0.0)
+        self.counters = Counter()
+        self.slowest: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def add(self, name: str, wall: float, cpu: float, *, nested=False):
+        """Adds time measured elsewhere to a phase
+
+        ``nested`` means the time was spent inside the phase currently running in this thread, which
+        then doesn't count it
+        """
+        with self._lock:
+            self.wall[name] = self.wall.get(name, 0.0) + wall
+            self.cpu[name] = self.cpu.get(name, 0.0) + cpu
+        stack = getattr(self._local, "stack", None)
+        if nested and stack:
+            stack[-1][1] += wall
+            stack[-1][2] += cpu
+
+    @contextmanager
+    def phase(self, name: str):
+        """Counts the time spent inside the with block towards a phase"""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        # The time spent in nested phases, subtracted once the phase ends
+        entry = [name, 0.0, 0.0]
+        stack.append(entry)
+        wall, cpu = clock()
+        try:
+            yield
+        finally:
+            end_wall, end_cpu = clock()
+            stack.pop()
+            wall, cpu = end_wall - wall, end_cpu - cpu
+            self.add(name, wall - entry[1], cpu - entry[2])
+            if stack:
+                stack[-1][1] += wall
+                stack[-1][2] += cpu
+
+    def iter_phase(self, iterable: Iterable, name: str) -> Iterator:
+        """Yields from an iterable, counting the time spent getting every item towards a phase"""
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name: str, amount: int = 1):
+        """Increases a counter"""
+        with self._lock:
+            self.counters[name] += amount
+
+    def file(self, path: str, seconds: float):
+        """Records how long a file took, keeping only the ``top`` slowest"""
+        with self._lock:
+            if len(self.slowest) < self.top:
+                heapq.heappush(self.slowest, (seconds, path))
+            elif self.top and seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (seconds, path))
+
+    def to_dict(self) -> dict:
+        """Converts the stats to a dict that can be serialized as JSON"""
+        return {
+            "phases": {name: {"wall": self.wall[name], "cpu": self.cpu[name]} for name in self.wall},
+            "counters": {name: self.counters[name] for name in COUNTERS},
+            "slowest_files": [
+                {"file": path, "seconds": seconds} for seconds, path in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+    def report(self, file=None):
+        """Prints the stats, on stderr by default so that they don't end up in the output"""
+        file = file or sys.stderr
+        print(f"{'phase':<8} {'wall (s)':>10} {'cpu (s)':>10}", file=file)
+        for name in self.wall:
+            print(f"{name:<8} {self.wall[name]:>10.4f} {self.cpu[name]:>10.4f}", file=file)
+        print("", file=file)
+        for name, description in COUNTERS.items():
+            print(f"{self.counters[name]:>12,} {description}", file=file)
+        if self.slowest:
+            print("\nslowest files:", file=file)
+            for seconds, path in sorted(self.slowest, reverse=True):
+                print(f"{seconds:>10.4f}s {path}", file=file)
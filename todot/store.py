@@ -0,0 +1,191 @@
+"""Stores large numbers of todos in columns instead of one object per todo"""
+from array import array
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from .todo import Todo, _split_associates
+
+__all__ = ("TodoStore", "TodoView")
+
+# The fields todos can be grouped by
+GROUP_FIELDS = ("file", "tag", "associate")
+
+
+class _Names:
+    """Gives every distinct string a small integer id"""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+    def id(self, name: str) -> int:
+        name_id = self.ids.get(name)
+        if name_id is None:
+            name_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+
+class TodoView:
+    """A read-only selection of the todos in a store, made by filtering or grouping it
+
+    Views only hold row numbers, todos are created one at a time when the view is iterated
+    """
+
+    def __init__(self, store: "TodoStore", rows: Sequence[int]):
+        self.store = store
+        self.rows = rows
+        self._name_width = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[Todo]:
+        return map(self.store.todo, self.rows)
+
+    @property
+    def name_width(self) -> int:
+        """The width of the widest ``file:line`` of these todos, as used by the printers for padding"""
+        if self._name_width is None:
+            store = self.store
+            self._name_width = max(
+                (store._file_widths[store.file_ids[row]] + len(str(store.lines[row])) for row in self.rows), default=0
+            )
+        return self._name_width
+
+    def filter(self, *, tag: str = None, associate: str = None, path_prefix: str = None) -> "TodoView":
+        """Returns the todos with the given tag and associate whose file starts with the given path"""
+        candidates = self.store._candidates(tag, associate, path_prefix)
+        if candidates is None:
+            return self
+        if isinstance(self.rows, range) and len(self.rows) == len(self.store):
+            return TodoView(self.store, candidates)
+        if len(candidates) < len(self.rows):
+            rows = set(self.rows)
+            return TodoView(self.store, array("I", (row for row in candidates if row in rows)))
+        candidates = set(candidates)
+        return TodoView(self.store, array("I", (row for row in self.rows if row in candidates)))
+
+    def group_by(self, field: str = "file") -> Dict[str, "TodoView"]:
+        """Groups the todos by ``file``, ``tag`` or ``associate`` in the order the groups first appear
+
+        Todos with several associates appear in the group of each of them and todos without any are left out
+        """
+        if field not in GROUP_FIELDS:
+            raise ValueError(f"Can't group by {field}, expected one of {', '.join(GROUP_FIELDS)}")
+        store = self.store
+        groups: Dict[int, array] = {}
+        if field == "associate":
+            offsets, ids = store.associate_offsets, store.associate_ids
+            for row in self.rows:
+                for i in range(offsets[row], offsets[row + 1]):
+                    groups.setdefault(ids[i], array("I")).append(row)
+            names = store.associates.names
+        else:
+            column = store.file_ids if field == "file" else store.tag_ids
+            for row in self.rows:
+                groups.setdefault(column[row], array("I")).append(row)
+            names = store.files.names if field == "file" else store.tags.names
+        return {names[key]: TodoView(store, rows) for key, rows in groups.items()}
+
+
+class TodoStore(TodoView):
+    """Todos stored column by column in arrays, with indexes by file, tag and associate
+
+    File names, tags and associates are stored once and referred to by id, the associates of a todo are
+    ``associate_ids[associate_offsets[row]:associate_offsets[row + 1]]`` and its text is stored the same
+    way as utf-8 in ``texts``
+    """
+
+    def __init__(self, todos: Iterable[Todo] = ()):
+        super().__init__(self, range(0))
+        self.files = _Names()
+        self.tags = _Names()
+        self.associates = _Names()
+        self.file_ids = array("I")
+        self.lines = array("I")
+        self.tag_ids = array("I")
+        self.associate_offsets = array("Q", [0])
+        self.associate_ids = array("I")
+        self.text_offsets = array("Q", [0])
+        self.texts = bytearray()
+        # Row numbers of the todos with each file, tag or associate id
+        self.file_index: Dict[int, array] = {}
+        self.tag_index: Dict[int, array] = {}
+        self.associate_index: Dict[int, array] = {}
+        self._file_widths = array("I")
+        self._name_width = 0
+        for todo in todos:
+            self.add(todo.file_name, todo.linepos, todo.tag, todo.associates, todo.text)
+
+    @classmethod
+    def from_records(cls, files: Iterable[Tuple[str, List[tuple]]]) -> "TodoStore":
+        """Creates a store from the ``(file, records)`` pairs made by the parser, without creating any todos"""
+        store = cls()
+        for file, records in files:
+            for linepos, tag, associates, text in records:
+                store.add(file, linepos, tag, _split_associates(associates), text)
+        return store
+
+    def __len__(self):
+        return len(self.lines)
+
+    def add(self, file_name: str, linepos: int, tag: str, associates: Sequence[str], text: str):
+        """Adds a todo"""
+        row = len(self.lines)
+        file_name = file_name.lstrip(".\\/")
+        file_id = self.files.id(file_name)
+        if file_id == len(self._file_widths):
+            # The width of "file_name: " without the line number
+            self._file_widths.append(len(file_name) + 2)
+        tag_id = self.tags.id(tag)
+        self.file_ids.append(file_id)
+        self.lines.append(linepos)
+        self.tag_ids.append(tag_id)
+        self.file_index.setdefault(file_id, array("I")).append(row)
+        self.tag_index.setdefault(tag_id, array("I")).append(row)
+        for associate in associates:
+            associate_id = self.associates.id(associate)
+            self.associate_ids.append(associate_id)
+            self.associate_index.setdefault(associate_id, array("I")).append(row)
+        self.associate_offsets.append(len(self.associate_ids))
+        self.texts += text.encode("utf-8")
+        self.text_offsets.append(len(self.texts))
+        self.rows = range(row + 1)
+        self._name_width = max(self._name_width, self._file_widths[file_id] + len(str(linepos)))
+
+    def todo(self, row: int) -> Todo:
+        """Creates the todo in a row"""
+        todo = Todo.__new__(Todo)
+        todo.file_name = self.files.names[self.file_ids[row]]
+        todo.linepos = self.lines[row]
+        todo.tag = self.tags.names[self.tag_ids[row]]
+        todo.text = self.texts[self.text_offsets[row]:self.text_offsets[row + 1]].decode("utf-8")
+        associates = self.associate_ids[self.associate_offsets[row]:self.associate_offsets[row + 1]]
+        todo.associates = tuple(self.associates.names[i] for i in associates)
+        return todo
+
+    def _candidates(self, tag, associate, path_prefix):
+        """Returns the sorted rows matching a filter using the indexes, or None if nothing is filtered"""
+        selections = []
+        if tag is not None:
+            tag = tag.upper()
+            rows = [self.tag_index[i] for name, i in self.tags.ids.items() if name.upper() == tag]
+            selections.append(rows[0] if len(rows) == 1 else sorted(row for i in rows for row in i))
+        if associate is not None:
+            associate_id = self.associates.ids.get(associate)
+            selections.append(self.associate_index[associate_id] if associate_id is not None else array("I"))
+        if path_prefix is not None:
+            path_prefix = path_prefix.replace("\\", "/").lstrip("./")
+            rows = [
+                self.file_index[i] for name, i in self.files.ids.items()
+                if name.replace("\\", "/").startswith(path_prefix)
+            ]
+            selections.append(rows[0] if len(rows) == 1 else sorted(row for i in rows for row in i))
+        if not selections:
+            return None
+        selections.sort(key=len)
+        rows = selections[0]
+        for other in selections[1:]:
+            other = set(other)
+            rows = [row for row in rows if row in other]
+        return rows if isinstance(rows, array) else array("I", rows)
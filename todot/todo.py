@@ -1,18 +1,118 @@
 """File for the todo class"""
-from typing import Match
+import sys
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, Match, Optional, Tuple
+
+
+@lru_cache(maxsize=4096)
+def _split_associates(associates: str) -> Tuple[str, ...]:
+    """Splits a comma delimited list of people, todos assigned to the same people share the tuple"""
+    return tuple(sys.intern(i.strip()) for i in associates.split(",") if i.strip())
 
 
 class Todo:
-    """Class for managing TODOs"""
-    def __init__(self, match: Match, *, file_name=None, linepos=None):
-        self.match = match
+    """Class for managing TODOs
 
-        self.file_name = file_name.lstrip(".\\/")
+    Todos only keep the fields extracted from the match, file names and tags are interned so that
+    todos from the same file share them
+    """
+
+    __slots__ = ("file_name", "linepos", "tag", "text", "associates")
+
+    def __init__(self, match: Match, *, file_name=None, linepos=None):
+        self.file_name = sys.intern(file_name.lstrip(".\\/"))
         self.linepos = linepos
 
-        self.tag = match.group("tag")
+        self.tag = sys.intern(match.group("tag"))
         self.text = match.group("text")
-        self.associates = [i.strip() for i in match.group("associates").split(",")]
+        self.associates = _split_associates(match.group("associates"))
+
+    @classmethod
+    def from_record(cls, record: Tuple[int, str, str, str], *, file_name=None):
+        """Creates a todo from a ``(linepos, tag, associates, text)`` record made by the parser"""
+        linepos, tag, associates, text = record
+        todo = cls.__new__(cls)
+
+        todo.file_name = sys.intern(file_name.lstrip(".\\/"))
+        todo.linepos = linepos
+
+        todo.tag = sys.intern(tag)
+        todo.text = text
+        todo.associates = _split_associates(associates)
+        return todo
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Todo":
+        """Creates a todo from a dict made by ``to_dict``"""
+        todo = cls.__new__(cls)
+        todo.file_name = sys.intern(data["file"])
+        todo.linepos = data["line"]
+        todo.tag = sys.intern(data["tag"])
+        todo.text = data["text"]
+        todo.associates = tuple(sys.intern(i) for i in data.get("associates") or ())
+        return todo
+
+    def to_dict(self) -> dict:
+        """Converts the todo to a dict that can be serialized as JSON"""
+        return {
+            "file": self.file_name.replace("\\", "/"),
+            "line": self.linepos,
+            "tag": self.tag,
+            "associates": list(self.associates),
+            "text": self.text,
+        }
 
     def __repr__(self):
-        return f"{self.file_name}:{self.linepos} {self.tag} {tuple(self.associates)}: {self.text}"
+        return f"{self.file_name}:{self.linepos} {self.tag} {self.associates}: {self.text}"
+
+
+class BlamedTodo(Todo):
+    """A todo with the author and the date of the line it is on, as found by git blame
+
+    Both are None when the line isn't committed or the file isn't in a git repository
+    """
+
+    __slots__ = ("author", "date")
+
+    @classmethod
+    def from_todo(cls, todo: Todo, author: Optional[str], date: Optional[str]) -> "BlamedTodo":
+        """Creates a blamed todo from a todo, the date is an ISO 8601 timestamp"""
+        blamed = cls.__new__(cls)
+        for name in Todo.__slots__:
+            setattr(blamed, name, getattr(todo, name))
+        blamed.author = author
+        blamed.date = date
+        return blamed
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        data["author"] = self.author
+        data["date"] = self.date
+        return data
+
+
+def fingerprint(todo: Todo, occurrence: int = 0) -> str:
+    """Returns an id for a todo that stays the same when lines are added or removed around it
+
+    It is made from the file, the tag, the text with its whitespace collapsed and ``occurrence``, which
+    tells apart identical todos in the same file
+    """
+    import hashlib
+
+    text = " ".join(todo.text.split())
+    key = "\0".join((todo.file_name.replace("\\", "/"), todo.tag.upper(), text, str(occurrence)))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def iter_fingerprints(todos: Iterable[Todo]) -> Iterator[Tuple[Todo, str]]:
+    """Pairs every todo with its fingerprint, the todos of each file have to come one after another"""
+    file_name = None
+    occurrences: Dict[Tuple[str, str], int] = {}
+    for todo in todos:
+        if todo.file_name != file_name:
+            file_name = todo.file_name
+            occurrences.clear()
+        key = (todo.tag.upper(), " ".join(todo.text.split()))
+        occurrence = occurrences.get(key, 0)
+        occurrences[key] = occurrence + 1
+        yield todo, fingerprint(todo, occurrence)
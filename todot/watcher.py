@@ -0,0 +1,305 @@
+"""Keeps the todos of a directory up to date while its files change"""
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .finder import Finder
+from .ignore import GitIgnoreMatcher
+from .parser import Parser
+from .todo import Todo
+
+__all__ = ("TodoIndex", "PollingWatcher", "InotifyWatcher", "Watcher")
+
+# A set of changed paths, None means that everything has to be scanned again
+Changes = Optional[Set[str]]
+
+
+def _key(todo: Todo):
+    return todo.linepos, todo.tag, todo.associates, todo.text
+
+
+def _diff(old: List[Todo], new: List[Todo]) -> Tuple[List[Todo], List[Todo]]:
+    """Returns the todos that were added and removed between two versions of a file"""
+    old_keys = set(map(_key, old))
+    new_keys = set(map(_key, new))
+    return [i for i in new if _key(i) not in old_keys], [i for i in old if _key(i) not in new_keys]
+
+
+class TodoIndex:
+    """The todos of every file, kept in the order the files were found"""
+
+    def __init__(self):
+        self.files: Dict[str, List[Todo]] = {}
+
+    def __iter__(self) -> Iterator[Todo]:
+        for todos in self.files.values():
+            yield from todos
+
+    def __len__(self):
+        return sum(map(len, self.files.values()))
+
+    def copy(self) -> "TodoIndex":
+        """Returns a copy that can be changed without changing this index"""
+        index = TodoIndex()
+        index.files = dict(self.files)
+        return index
+
+    def set(self, file: str, todos: List[Todo]) -> Tuple[List[Todo], List[Todo]]:
+        """Replaces the todos of a file, returning the todos that were added and removed"""
+        old = self.files.get(file, [])
+        if todos:
+            self.files[file] = todos
+        else:
+            self.files.pop(file, None)
+        return _diff(old, todos)
+
+    def remove(self, file: str) -> List[Todo]:
+        """Removes a file, returning its todos"""
+        return self.files.pop(file, [])
+
+    def remove_tree(self, directory: str) -> List[Todo]:
+        """Removes every file inside a directory, returning their todos"""
+        prefix = os.path.join(directory, "")
+        removed = []
+        for file in [i for i in self.files if i.startswith(prefix)]:
+            removed.extend(self.files.pop(file))
+        return removed
+
+
+class PollingWatcher:
+    """Finds changed files by comparing snapshots of the size and modification time of every file
+
+    This works everywhere but every poll searches through the whole directory again
+    """
+
+    def __init__(self, finder: Finder, interval: float = 1.0):
+        self.finder = finder
+        self.interval = interval
+        self.snapshot = self._snapshot()
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for file in self.finder.iter_find():
+            try:
+                stat = os.stat(file)
+            except OSError:
+                continue
+            snapshot[file] = (stat.st_size, stat.st_mtime_ns)
+        # Hidden files are never found, so the .gitignore files are added to notice when the rules change
+        if self.finder.ignore is not None:
+            for file in list(self.finder.ignore.paths):
+                try:
+                    stat = os.stat(file)
+                except OSError:
+                    continue
+                snapshot[file] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def _poll(self) -> Set[str]:
+        old, self.snapshot = self.snapshot, self._snapshot()
+        changed = {i for i, j in self.snapshot.items() if old.get(i) != j}
+        return changed | (old.keys() - self.snapshot.keys())
+
+    def wait(self, timeout: float = None) -> Changes:
+        """Waits until something changes or the timeout runs out, returning the changed paths"""
+        if timeout is not None:
+            time.sleep(timeout)
+            return self._poll()
+        while True:
+            time.sleep(self.interval)
+            changed = self._poll()
+            if changed:
+                return changed
+
+    def refresh(self):
+        """Does nothing, every poll searches through the whole directory again anyway"""
+
+    def close(self):
+        """Stops watching"""
+
+
+class InotifyWatcher:
+    """Finds changed files using inotify on linux, without searching through the directory again
+
+    Every searched directory is watched, new directories are watched as soon as they are created
+    """
+
+    IN_MODIFY = 0x2
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+    IN_CLOEXEC = 0o2000000
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self, finder: Finder):
+        import ctypes
+        import ctypes.util
+
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on linux")
+        self.finder = finder
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not supported by the c library")
+        self._add_watch = libc.inotify_add_watch
+        self._get_errno = ctypes.get_errno
+        self.fd = libc.inotify_init1(self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(self._get_errno(), "Failed to start inotify")
+        self.directories: Dict[int, str] = {}
+        try:
+            for directory in finder.iter_directories():
+                self._add(directory)
+        except OSError:
+            self.close()
+            raise
+
+    def _add(self, directory: str):
+        descriptor = self._add_watch(self.fd, os.fsencode(directory), self.MASK)
+        if descriptor < 0:
+            raise OSError(self._get_errno(), f"Failed to watch {directory}")
+        self.directories[descriptor] = directory
+
+    def refresh(self):
+        """Watches the searched directories that aren't watched yet, such as ones that are no longer ignored"""
+        watched = set(self.directories.values())
+        for directory in self.finder.iter_directories():
+            if directory not in watched:
+                self._add(directory)
+
+    def wait(self, timeout: float = None) -> Changes:
+        """Waits until something changes or the timeout runs out, returning the changed paths"""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        data = os.read(self.fd, 1024 * 64)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            descriptor, mask, _, length = struct.unpack_from("iIII", data, offset)
+            name = os.fsdecode(data[offset + 16:offset + 16 + length].rstrip(b"\0"))
+            offset += 16 + length
+            if mask & self.IN_Q_OVERFLOW:
+                return None
+            if mask & self.IN_IGNORED:
+                self.directories.pop(descriptor, None)
+                continue
+            directory = self.directories.get(descriptor)
+            if directory is None:
+                continue
+            path = os.path.join(directory, name)
+            changed.add(path)
+            if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                # Files could have been created before the new directory was watched
+                for root, directories, files in os.walk(path):
+                    directories[:] = [i for i in directories if not i.startswith(".")]
+                    self._add(root)
+                    changed.update(os.path.join(root, i) for i in files)
+        return changed
+
+    def close(self):
+        """Stops watching"""
+        os.close(self.fd)
+
+
+class Watcher:
+    """Keeps an index of todos up to date by only parsing the files that changed
+
+    Bursts of changes, such as saving many files at once, are collected until nothing has changed for
+    ``debounce`` seconds and then handled together
+    """
+
+    def __init__(self, finder: Finder, parser: Parser, *, polling=False, interval=1.0, debounce=0.2):
+        self.finder = finder
+        self.parser = parser
+        self.interval = interval
+        self.debounce = debounce
+        self.stopped = False
+        self.index = TodoIndex()
+        # Start watching before the first scan so that nothing changed during it is missed
+        self.source = None
+        if not polling:
+            try:
+                self.source = InotifyWatcher(finder)
+            except OSError as exc:
+                print(f"Failed to start inotify due to {exc}, checking for changes every {interval} seconds instead")
+        if self.source is None:
+            self.source = PollingWatcher(finder, interval)
+        self.scan()
+
+    def scan(self) -> Tuple[List[Todo], List[Todo]]:
+        """Parses every file again, returning the todos that were added and removed"""
+        # The new index is only swapped in once it is complete so that it can be read from other threads
+        old, index = self.index, TodoIndex()
+        for file, todos in self.parser.iter_parse_files(self.finder.iter_find()):
+            index.set(file, todos)
+        self.index = index
+        added, removed = [], []
+        for file in list(self.index.files) + [i for i in old.files if i not in self.index.files]:
+            file_added, file_removed = _diff(old.files.get(file, []), self.index.files.get(file, []))
+            added.extend(file_added)
+            removed.extend(file_removed)
+        return added, removed
+
+    def update(self, changed: Set[str]) -> Tuple[List[Todo], List[Todo]]:
+        """Parses the changed paths again, returning the todos that were added and removed"""
+        if any(os.path.basename(i) == ".gitignore" for i in changed):
+            # The rules are read again and the directories that are no longer ignored are watched from now on
+            if self.finder.ignore is not None:
+                self.finder.ignore = GitIgnoreMatcher()
+            self.source.refresh()
+            return self.scan()
+        # Changes are made to a copy that is swapped in at once, so that the index can be read from other threads
+        index = self.index.copy()
+        added, removed = [], []
+        for path in sorted(changed):
+            if os.path.isdir(path):
+                continue
+            if not os.path.isfile(path) or not self.finder.accepts(path):
+                removed.extend(index.remove(path))
+                removed.extend(index.remove_tree(path))
+                continue
+            try:
+                _, todos = next(self.parser.iter_parse_files([path]))
+            except (OSError, UnicodeDecodeError):
+                continue
+            file_added, file_removed = index.set(path, todos)
+            added.extend(file_added)
+            removed.extend(file_removed)
+        self.index = index
+        return added, removed
+
+    def __iter__(self) -> Iterator[Tuple[List[Todo], List[Todo]]]:
+        """Waits for changes until stopped, yielding the todos that were added and removed every time"""
+        try:
+            while not self.stopped:
+                changed = self.source.wait(self.interval)
+                if changed is not None and not changed:
+                    continue
+                while changed is not None:
+                    more = self.source.wait(self.debounce)
+                    if more is None:
+                        changed = None
+                    elif more:
+                        changed |= more
+                        continue
+                    break
+                if changed is None:
+                    added, removed = self.scan()
+                else:
+                    added, removed = self.update(changed)
+                if added or removed:
+                    yield added, removed
+        finally:
+            self.source.close()
+
+    def stop(self):
+        """Stops waiting for changes within ``interval`` seconds, can be called from another thread"""
+        self.stopped = True